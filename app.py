@@ -1,10 +1,14 @@
-from flask import Flask, render_template, request, redirect, session, url_for, flash, send_from_directory
+from flask import Flask, render_template, request, redirect, session, url_for, flash, send_from_directory, send_file, Response, make_response, abort, jsonify, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from config import Config
 from db import db
 import os
-from datetime import datetime
+import queue
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 # --- CONFIGURAÇÃO INICIAL ---
 app = Flask(__name__)
@@ -36,13 +40,50 @@ from models.crimes import Crime
 from models.armas import Arma, MovimentacaoArma
 from models.acadepol import Comunicado
 from models.avisos import Aviso
+from models.estatisticas import EstatisticaAgregada, MarcaEstatistica
+from models.auditoria import ArquivoAuditoria
+from models.api import TokenApi
+from models.arquivo import BoletimArquivado, AutoPrisaoArquivado, boletins_crimes_arquivo, autos_crimes_arquivo
+from models.evidencias import ChecksumArquivo
+from models.delegacias import Delegacia
+from servicos.esquema import atualizar_esquema
+from servicos.estatisticas import (atualizar_estatisticas, ajustar_status_boletim, ajustar_crimes_boletim,
+                                   painel_estatisticas)
+from servicos.auditoria import consultar_logs, ler_arquivo
+from servicos.dossie import solicitar_dossie
+from servicos import eventos
+from servicos.versoes import registrar_versionamento
+from servicos import api
+from servicos.similaridade import registrar_indice_pessoas, buscar_semelhantes
+from servicos import busca
+from servicos.arquivamento import restaurar_boletim, obter_boletim
+from servicos.unidade_trabalho import registrar_unidade_trabalho, apos_commit
+from servicos.integridade import salvar_arquivo, descartar_arquivo
+from servicos.delegacias import (registrar_delegacias, definir_escopo, sem_escopo, ve_todas, escopo_atual,
+                                 canal_eventos, obter_delegacia, vincular_delegacias, TODAS)
+from servicos.agendador import registrar_agendador
+from servicos.compressao import registrar_compressao
+from servicos.limites import registrar_limites
+from servicos.custodia import (registrar_custodia, cautelas_vencidas, abrir_cautela, fechar_cautela,
+                               local_para_utc)
+
+registrar_limites(app)
+registrar_versionamento()
+registrar_indice_pessoas()
+busca.registrar_indice_busca()
+registrar_unidade_trabalho(app)
+registrar_delegacias(app)
+registrar_agendador(app)
+registrar_custodia(app)
+registrar_compressao(app)
 
 # --- HELPERS E DECORATORS ---
 from functools import wraps
 
 def current_user():
     if 'user_id' in session:
-        return Usuario.query.get(session['user_id'])
+        # O próprio usuário continua visível com outra delegacia em foco
+        return db.session.get(Usuario, session['user_id'], execution_options={'todas_delegacias': True})
     return None
 
 def login_required(f):
@@ -53,11 +94,92 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def api_token_required(f):
+    # API usa "Authorization: Bearer <token>"; o cookie de sessão não é aceito aqui
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        cabecalho = request.headers.get('Authorization', '')
+        if not cabecalho.startswith('Bearer '):
+            return jsonify(erro='Token de acesso ausente.'), 401
+        token_hash = hashlib.sha256(cabecalho[7:].strip().encode()).hexdigest()
+        token = TokenApi.query.filter_by(token_hash=token_hash, ativo=True).first()
+        if not token:
+            return jsonify(erro='Token inválido ou revogado.'), 401
+        # Grava o último uso no máximo a cada 5 min, para leitura não virar escrita
+        if not token.ultimo_uso or datetime.utcnow() - token.ultimo_uso > timedelta(minutes=5):
+            token.ultimo_uso = datetime.utcnow()
+        # Token de servidor excluído: sem usuário não há escopo nem autor para o registro
+        if not definir_escopo(token.usuario_id):
+            return jsonify(erro='Token inválido ou revogado.'), 401
+        g.token_api = token
+        return f(*args, **kwargs)
+    return decorated
+
 def registrar_log(acao, alvo, detalhes=""):
+    # Vai no commit da requisição; falha no log (SAVEPOINT) não desfaz a operação registrada
     user = current_user()
     if user:
-        db.session.add(LogAtividade(autor_id=user.id, acao=acao, alvo=str(alvo), detalhes=detalhes))
-        db.session.commit()
+        db.session.flush()
+        try:
+            with db.session.begin_nested():
+                db.session.add(LogAtividade(autor_id=user.id, acao=acao, alvo=str(alvo), detalhes=detalhes))
+        except SQLAlchemyError:
+            app.logger.exception('Falha ao registrar log de atividade (%s)', acao)
+
+def prefixo_like(texto):
+    # Prefixo literal para LIKE ... ESCAPE '/': '%' e '_' digitados não viram curinga,
+    # e o padrão constante permite ao SQLite usar o índice NOCASE da coluna
+    return texto.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+
+def crimes_do_formulario():
+    # O select "natureza_crime" envia o id do Crime; o vínculo fica em boletins_crimes/autos_crimes
+    ids = [int(i) for i in request.form.getlist('natureza_crime') if i.isdigit()]
+    return Crime.query.filter(Crime.id.in_(ids)).all() if ids else []
+
+# Muda a cada deploy/reinício: invalida ETags gerados com templates antigos
+INICIO_APP = int(time.time())
+
+def assinatura_tabela(*colunas):
+    # Hash curto de uma tabela pequena sem versão própria (cargos, catálogo de crimes)
+    # para compor ETags de páginas que a exibem
+    linhas = db.session.query(*colunas).order_by(colunas[0]).all()
+    return hashlib.sha1(repr(linhas).encode()).hexdigest()[:8]
+
+def responder_condicional(etag, renderizar):
+    """Responde 304 se o cliente já tem esta versão; senão chama renderizar().
+
+    O ETag inclui o usuário logado, a versão dele e a delegacia em foco, pois a
+    barra lateral e os botões dependem de quem está vendo. Com mensagens flash pendentes a página
+    é sempre renderizada para não engolir o alerta.
+    """
+    eu = current_user()
+    etag = f"{etag}-u{eu.id}.{eu.versao}-d{escopo_atual()}-{INICIO_APP}"
+    if not session.get('_flashes') and request.if_none_match.contains_weak(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = make_response(renderizar())
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+def notificar_contadores(delegacia_id, **deltas):
+    # Envia a variação dos contadores do painel (ex: bo_pendentes=+1) aos clientes SSE da delegacia
+    deltas = {k: v for k, v in deltas.items() if v}
+    if deltas:
+        apos_commit(eventos.publicar, 'contadores', deltas, delegacia_id)
+
+def oficial_do_formulario():
+    # O select "policial_responsavel" envia o id do oficial; na falta, assume o usuário logado
+    oficial_id = request.form.get('policial_responsavel', type=int)
+    return (Usuario.query.get(oficial_id) if oficial_id else None) or current_user()
+
+def delegacia_do_formulario(atual=None):
+    # Só quem vê todas as delegacias lota servidores em outra unidade (ou cria uma nova)
+    if not ve_todas():
+        return atual or g.get('delegacia_usuario')
+    if request.form.get('nova_delegacia', '').strip():
+        return obter_delegacia(request.form['nova_delegacia']).id
+    return request.form.get('delegacia_id', type=int) or atual
 
 def pode_alterar_usuario(alvo_user):
     me = current_user()
@@ -70,7 +192,10 @@ def inject_helpers():
     return dict(
         pode_gerenciar=lambda: current_user() and current_user().nivel_hierarquico >= 80,
         current_user=current_user, 
-        pode_alterar_usuario=pode_alterar_usuario
+        pode_alterar_usuario=pode_alterar_usuario,
+        ve_todas_delegacias=ve_todas,
+        delegacia_em_foco=escopo_atual,
+        listar_delegacias=lambda: Delegacia.query.order_by(Delegacia.nome).all()
     )
 
 # --- ROTAS DE AUTENTICAÇÃO ---
@@ -82,9 +207,11 @@ def index():
 @app.route('/login', methods=['GET','POST'])
 def login():
     if request.method == 'POST':
-        user = Usuario.query.filter_by(matricula=request.form['matricula']).first()
+        user = Usuario.query.filter_by(matricula=request.form['matricula']) \
+            .execution_options(todas_delegacias=True).first()
         if user and check_password_hash(user.senha, request.form['senha']):
             session['user_id'] = user.id
+            session.pop('delegacia_ativa', None)
             registrar_log('Login', 'Sistema', 'Acesso realizado')
             flash(f'Bem-vindo, {user.nome}.', 'success')
             return redirect(url_for('dashboard'))
@@ -94,15 +221,31 @@ def login():
 @app.route('/logout')
 def logout():
     session.pop('user_id', None)
+    session.pop('delegacia_ativa', None)
     return redirect(url_for('login'))
 
+@app.route('/delegacia/foco', methods=['POST'])
+@login_required
+def selecionar_delegacia():
+    # Quem vê todas as delegacias pode restringir as páginas a uma delas (vazio = todas)
+    if ve_todas():
+        session['delegacia_ativa'] = request.form.get('delegacia_id', type=int)
+    return redirect(request.referrer or url_for('dashboard'))
+
 # --- DASHBOARD E AVISOS ---
 
+def avisos_visiveis():
+    # Avisos gerais e os da delegacia em foco (quem vê todas recebe todos)
+    escopo = escopo_atual()
+    if escopo == TODAS:
+        return Aviso.query
+    return Aviso.query.filter(db.or_(Aviso.delegacia_id.is_(None), Aviso.delegacia_id == escopo))
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     # Busca avisos ordenados por data (mais recentes primeiro)
-    avisos = Aviso.query.order_by(Aviso.data_criacao.desc()).limit(10).all()
+    avisos = avisos_visiveis().order_by(Aviso.data_criacao.desc()).limit(10).all()
     
     # Dados para o resumo lateral (Contadores em Tempo Real)
     contadores = {
@@ -112,7 +255,8 @@ def dashboard():
         'efetivo_ativo': Usuario.query.count()
     }
     
-    return render_template('dashboard.html', usuario=current_user(), avisos=avisos, contadores=contadores)
+    return render_template('dashboard.html', usuario=current_user(), avisos=avisos, contadores=contadores,
+                           cautelas_vencidas=cautelas_vencidas())
 
 @app.route('/dashboard/aviso/criar', methods=['POST'])
 @login_required
@@ -129,7 +273,15 @@ def criar_aviso():
         autor_id=current_user().id
     )
     db.session.add(novo_aviso)
-    db.session.commit()
+    db.session.flush()
+    apos_commit(eventos.publicar, 'aviso', {
+        'id': novo_aviso.id,
+        'titulo': novo_aviso.titulo,
+        'conteudo': novo_aviso.conteudo,
+        'prioridade': novo_aviso.prioridade,
+        'data': novo_aviso.data_criacao.strftime('%d/%m %H:%M'),
+        'autor': current_user().nome
+    })
     registrar_log('Novo Aviso', novo_aviso.titulo, novo_aviso.prioridade)
     flash('Aviso publicado no mural.', 'success')
     return redirect(url_for('dashboard'))
@@ -137,16 +289,37 @@ def criar_aviso():
 @app.route('/dashboard/aviso/excluir/<int:id>')
 @login_required
 def excluir_aviso(id):
-    aviso = Aviso.query.get_or_404(id)
+    aviso = avisos_visiveis().filter(Aviso.id == id).first_or_404()
     # Apenas quem criou ou chefia pode apagar
     if aviso.autor_id == current_user().id or current_user().nivel_hierarquico >= 80:
         db.session.delete(aviso)
-        db.session.commit()
+        apos_commit(eventos.publicar, 'aviso_removido', {'id': id}, aviso.delegacia_id)
         flash('Aviso removido.', 'success')
     else:
         flash('Sem permissão.', 'danger')
     return redirect(url_for('dashboard'))
 
+@app.route('/dashboard/eventos')
+@login_required
+def eventos_dashboard():
+    # Tudo que precisa do banco acontece antes do stream: a sessão é liberada no
+    # teardown do request e a conexão aberta fica só esperando a fila em memória.
+    fila = eventos.assinar(canal_eventos())
+
+    def fluxo():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    yield fila.get(timeout=15)
+                except queue.Empty:
+                    yield ': ping\n\n'  # Mantém proxies sem derrubar a conexão
+        finally:
+            eventos.cancelar(fila)
+
+    return Response(fluxo(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # --- MÓDULO: PESSOAS ---
 
 @app.route('/pessoas')
@@ -163,6 +336,12 @@ def banco_pessoas():
 @login_required
 def cadastrar_pessoa():
     if request.method == 'POST':
+        # Grafias parecidas de nome/nome da mãe: mostra os registros antes de gravar
+        if not request.form.get('confirmar_novo'):
+            semelhantes = buscar_semelhantes(request.form['nome'], request.form.get('nome_mae'))
+            if semelhantes:
+                return render_template('cadastrar_pessoa.html', semelhantes=semelhantes, dados=request.form)
+
         p = Pessoa(
             nome=request.form['nome'],
             rg=request.form['rg'],
@@ -172,14 +351,23 @@ def cadastrar_pessoa():
             antecedentes=request.form['antecedentes']
         )
         try:
-            db.session.add(p)
-            db.session.commit()
+            with db.session.begin_nested():
+                db.session.add(p)
+        except IntegrityError:
+            flash('Erro: RG já cadastrado.', 'danger')
+        else:
             flash('Cidadão cadastrado com sucesso.', 'success')
             return redirect(url_for('banco_pessoas'))
-        except:
-            db.session.rollback()
-            flash('Erro: RG já cadastrado.', 'danger')
-    return render_template('cadastrar_pessoa.html')
+    return render_template('cadastrar_pessoa.html', dados={})
+
+@app.route('/pessoas/semelhantes')
+@login_required
+def pessoas_semelhantes():
+    # Consulta feita pelo formulário de cadastro enquanto o nome é digitado
+    semelhantes = buscar_semelhantes(request.args.get('nome', ''), request.args.get('nome_mae'), limite=5)
+    return jsonify([{'id': p.id, 'nome': p.nome, 'rg': p.rg, 'nome_mae': p.nome_mae,
+                     'data_nascimento': p.data_nascimento, 'pontos': pontos}
+                    for pontos, p in semelhantes])
 
 # --- MÓDULO: CRIMES (TIPIFICAÇÃO) ---
 
@@ -199,7 +387,6 @@ def cadastrar_crime():
             pena=request.form['pena']
         )
         db.session.add(c)
-        db.session.commit()
         flash('Crime adicionado ao catálogo.', 'success')
         return redirect(url_for('gerenciar_crimes'))
     return render_template('cadastrar_crime.html')
@@ -209,8 +396,25 @@ def cadastrar_crime():
 @app.route('/boletins')
 @login_required
 def boletins():
-    boletins = Boletim.query.order_by(Boletim.data.desc()).all()
-    return render_template('boletins.html', boletins=boletins)
+    crime_id = request.args.get('crime', type=int)
+    if request.args.get('arquivo'):
+        # Arquivo morto: consultado sob demanda, sempre paginado
+        query = BoletimArquivado.query
+        if crime_id:
+            query = query.join(boletins_crimes_arquivo, boletins_crimes_arquivo.c.boletim_id == BoletimArquivado.id) \
+                         .filter(boletins_crimes_arquivo.c.crime_id == crime_id)
+        paginacao = query.options(db.joinedload(BoletimArquivado.policial)) \
+            .order_by(BoletimArquivado.data.desc()) \
+            .paginate(page=request.args.get('page', 1, type=int), per_page=50, error_out=False)
+        return render_template('boletins.html', boletins=paginacao.items, paginacao=paginacao, arquivo=True,
+                               crimes=Crime.query.all(), filtro_crime=crime_id)
+
+    query = Boletim.query
+    if crime_id:
+        # Join indexado pela tabela de vínculo, sem LIKE na descrição
+        query = query.join(Boletim.crimes).filter(Crime.id == crime_id)
+    boletins = query.options(db.joinedload(Boletim.policial)).order_by(Boletim.data.desc()).all()
+    return render_template('boletins.html', boletins=boletins, crimes=Crime.query.all(), filtro_crime=crime_id)
 
 @app.route('/boletins/cadastrar', methods=['GET','POST'])
 @login_required
@@ -226,23 +430,27 @@ def cadastrar_boletim():
             if file and file.filename != '' and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
                 filename = f"capa_bo_{datetime.now().timestamp()}_{filename}"
-                file.save(os.path.join(app.config['EVIDENCE_FOLDER'], filename))
-                arquivo_nome = filename
+                arquivo_nome = salvar_arquivo(file, 'evidencias', filename)
 
-        natureza = request.form.get('natureza_crime')
+        crimes_sel = crimes_do_formulario()
+        natureza = ', '.join(c.rotulo for c in crimes_sel)
         desc_texto = request.form['descricao']
         descricao_final = f"[Natureza: {natureza}] \n{desc_texto}" if natureza else desc_texto
 
+        oficial = oficial_do_formulario()
         b = Boletim(
             autor=request.form['autor'], 
             vitima=request.form['vitima'], 
             descricao=descricao_final, 
-            policial_responsavel=request.form.get('policial_responsavel', current_user().nome),
+            policial_responsavel=oficial.nome,
+            policial_responsavel_id=oficial.id,
             status='Pendente',
-            arquivo_evidencia=arquivo_nome
+            arquivo_evidencia=arquivo_nome,
+            crimes=crimes_sel
         )
         db.session.add(b)
-        db.session.commit()
+        db.session.flush()
+        notificar_contadores(b.delegacia_id, bo_pendentes=1)
         flash('Boletim registrado com sucesso.', 'success')
         # Redireciona para detalhes para permitir adicionar mais anexos
         return redirect(url_for('detalhes_boletim', id=b.id))
@@ -252,13 +460,41 @@ def cadastrar_boletim():
 @app.route('/boletins/detalhes/<int:id>')
 @login_required
 def detalhes_boletim(id):
-    boletim = Boletim.query.get_or_404(id)
-    return render_template('detalhes_boletim.html', boletim=boletim)
+    # Consulta só as versões (PK) antes de carregar o dossiê completo
+    # B.O. arquivado continua no mesmo endereço, lido do arquivo morto
+    for modelo, prefixo in ((Boletim, 'bo'), (BoletimArquivado, 'boa')):
+        versoes = db.session.query(modelo.versao, Usuario.versao) \
+            .outerjoin(Usuario, Usuario.id == modelo.policial_responsavel_id) \
+            .filter(modelo.id == id).first()
+        if versoes:
+            break
+    else:
+        abort(404)
+
+    def renderizar():
+        boletim = db.session.get(modelo, id)
+        return render_template('detalhes_boletim.html', boletim=boletim)
+    return responder_condicional(f"{prefixo}{id}.{versoes[0]}.{versoes[1]}", renderizar)
+
+@app.route('/boletins/dossie/<int:id>')
+@login_required
+def dossie_boletim(id):
+    boletim = obter_boletim(id) or abort(404)
+    caminho = solicitar_dossie(boletim)
+    if caminho:
+        return send_file(caminho, as_attachment=True, download_name=f'dossie_bo_{boletim.id:03d}_{boletim.data.year}.zip')
+    flash('Dossiê em preparação. Tente baixar novamente em alguns instantes.', 'info')
+    return redirect(url_for('detalhes_boletim', id=id))
 
 @app.route('/boletins/editar/<int:id>', methods=['GET', 'POST'])
 @login_required
 def editar_boletim(id):
-    boletim = Boletim.query.get_or_404(id)
+    boletim = db.session.get(Boletim, id)
+    if not boletim:
+        if db.session.get(BoletimArquivado, id):
+            flash('B.O. arquivado: reabra o caso para editar.', 'warning')
+            return redirect(url_for('detalhes_boletim', id=id))
+        abort(404)
     oficiais = Usuario.query.all()
     crimes = Crime.query.all()
 
@@ -266,20 +502,28 @@ def editar_boletim(id):
         boletim.autor = request.form['autor']
         boletim.vitima = request.form['vitima']
         boletim.descricao = request.form['descricao']
-        boletim.policial_responsavel = request.form['policial_responsavel']
+        oficial = oficial_do_formulario()
+        boletim.policial_responsavel = oficial.nome
+        boletim.policial_responsavel_id = oficial.id
         
+        status_anterior = boletim.status
         if 'status' in request.form:
             boletim.status = request.form['status']
+            ajustar_status_boletim(boletim, status_anterior)
+
+        # O select já vem com a tipificação atual; vazio significa remover todas
+        crimes_anteriores = list(boletim.crimes)
+        boletim.crimes = crimes_do_formulario()
+        ajustar_crimes_boletim(boletim, crimes_anteriores)
         
         if 'evidencia' in request.files:
             file = request.files['evidencia']
             if file and file.filename != '' and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
                 filename = f"capa_bo_{datetime.now().timestamp()}_{filename}"
-                file.save(os.path.join(app.config['EVIDENCE_FOLDER'], filename))
-                boletim.arquivo_evidencia = filename
+                boletim.arquivo_evidencia = salvar_arquivo(file, 'evidencias', filename)
 
-        db.session.commit()
+        notificar_contadores(boletim.delegacia_id, bo_pendentes=(boletim.status == 'Pendente') - (status_anterior == 'Pendente'))
         flash('Ocorrência atualizada.', 'success')
         return redirect(url_for('detalhes_boletim', id=boletim.id))
 
@@ -288,14 +532,17 @@ def editar_boletim(id):
 @app.route('/boletins/resolver/<int:id>')
 @login_required
 def resolver_boletim(id):
-    boletim = Boletim.query.get_or_404(id)
+    # Reabrir um caso arquivado o traz de volta às tabelas ativas
+    boletim = db.session.get(Boletim, id) or restaurar_boletim(id) or abort(404)
+    status_anterior = boletim.status
     if boletim.status == 'Pendente':
         boletim.status = 'Concluído'
         flash('Caso marcado como Concluído.', 'success')
     else:
         boletim.status = 'Pendente'
         flash('Caso reaberto.', 'warning')
-    db.session.commit()
+    ajustar_status_boletim(boletim, status_anterior)
+    notificar_contadores(boletim.delegacia_id, bo_pendentes=1 if boletim.status == 'Pendente' else -1)
     return redirect(url_for('detalhes_boletim', id=id))
 
 @app.route('/boletins/anexar/<int:id>', methods=['POST'])
@@ -310,40 +557,69 @@ def adicionar_anexo_boletim(id):
             
             tipo = 'Imagem' if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')) else 'Documento'
             
-            file.save(os.path.join(app.config['EVIDENCE_FOLDER'], filename))
+            salvar_arquivo(file, 'evidencias', filename)
             novo_anexo = AnexoBoletim(boletim_id=boletim.id, arquivo=filename, tipo=tipo)
             db.session.add(novo_anexo)
-            db.session.commit()
             flash('Arquivo anexado ao dossiê.', 'success')
     return redirect(url_for('detalhes_boletim', id=id))
 
 @app.route('/boletins/anexo/excluir/<int:id>')
 @login_required
 def excluir_anexo_boletim(id):
-    anexo = AnexoBoletim.query.get_or_404(id)
+    # Pelo B.O. (que tem escopo de delegacia): anexo de outra delegacia dá 404
+    anexo = AnexoBoletim.query.join(Boletim, Boletim.id == AnexoBoletim.boletim_id) \
+        .filter(AnexoBoletim.id == id).first_or_404()
     boletim_id = anexo.boletim_id
-    try:
-        os.remove(os.path.join(app.config['EVIDENCE_FOLDER'], anexo.arquivo))
-    except: pass
+    descartar_arquivo('evidencias', anexo.arquivo)
     db.session.delete(anexo)
-    db.session.commit()
     flash('Anexo removido.', 'success')
     return redirect(url_for('detalhes_boletim', id=boletim_id))
 
+# --- MÓDULO: BUSCA DE NARRATIVAS ---
+
+@app.route('/busca')
+@login_required
+def busca_narrativas():
+    termos = request.args.get('q', '').strip()
+    tipo = request.args.get('tipo') or None
+    resultado = None
+    if termos:
+        if busca.disponivel():
+            resultado = busca.buscar(termos, tipo=tipo, pagina=request.args.get('page', 1, type=int))
+        else:
+            flash('Busca textual disponível apenas com banco SQLite (FTS5).', 'warning')
+    return render_template('busca.html', termos=termos, tipo=tipo, resultado=resultado)
+
 # --- MÓDULO: AUTOS DE PRISÃO ---
 
 @app.route('/autos')
 @login_required
 def autos():
-    autos = AutoPrisao.query.all()
-    return render_template('auto_prisao.html', autos=autos)
+    crime_id = request.args.get('crime', type=int)
+    if request.args.get('arquivo'):
+        query = AutoPrisaoArquivado.query
+        if crime_id:
+            query = query.join(autos_crimes_arquivo, autos_crimes_arquivo.c.auto_prisao_id == AutoPrisaoArquivado.id) \
+                         .filter(autos_crimes_arquivo.c.crime_id == crime_id)
+        paginacao = query.options(db.joinedload(AutoPrisaoArquivado.policial)) \
+            .order_by(AutoPrisaoArquivado.horario.desc()) \
+            .paginate(page=request.args.get('page', 1, type=int), per_page=50, error_out=False)
+        return render_template('auto_prisao.html', autos=paginacao.items, paginacao=paginacao, arquivo=True,
+                               crimes=Crime.query.all(), filtro_crime=crime_id)
+
+    query = AutoPrisao.query
+    if crime_id:
+        query = query.join(AutoPrisao.crimes).filter(Crime.id == crime_id)
+    autos = query.options(db.joinedload(AutoPrisao.policial)).all()
+    return render_template('auto_prisao.html', autos=autos, crimes=Crime.query.all(), filtro_crime=crime_id)
 
 @app.route('/autos/cadastrar', methods=['GET','POST'])
 @login_required
 def cadastrar_auto():
     crimes = Crime.query.all()
     if request.method == 'POST':
-        natureza = request.form.get('natureza_crime')
+        crimes_sel = crimes_do_formulario()
+        natureza = ', '.join(c.rotulo for c in crimes_sel)
         desc_texto = request.form['descricao']
         descricao_final = f"[Autuado por: {natureza}] \n{desc_texto}" if natureza else desc_texto
 
@@ -351,10 +627,11 @@ def cadastrar_auto():
             preso=request.form['preso'], 
             descricao_fato=descricao_final, 
             testemunhas=request.form['testemunhas'], 
-            policial_responsavel=current_user().nome
+            policial_responsavel=current_user().nome,
+            policial_responsavel_id=current_user().id,
+            crimes=crimes_sel
         )
         db.session.add(a)
-        db.session.commit()
         flash('Prisão registrada.', 'success')
         return redirect(url_for('autos'))
     return render_template('cadastrar_auto.html', crimes=crimes)
@@ -362,36 +639,108 @@ def cadastrar_auto():
 @app.route('/autos/editar/<int:id>', methods=['GET', 'POST'])
 @login_required
 def editar_auto(id):
-    auto = AutoPrisao.query.get_or_404(id)
-    crimes = Crime.query.all()
     if request.method == 'POST':
+        auto = AutoPrisao.query.get_or_404(id)
         auto.preso = request.form['preso']
         auto.descricao_fato = request.form['descricao']
         auto.testemunhas = request.form['testemunhas']
-        if request.form.get('natureza_crime'):
-             auto.descricao_fato = f"[Natureza: {request.form.get('natureza_crime')}] \n{request.form['descricao']}"
-        
-        db.session.commit()
+        crimes_sel = crimes_do_formulario()
+        auto.crimes = crimes_sel
+        if crimes_sel:
+            natureza = ', '.join(c.rotulo for c in crimes_sel)
+            auto.descricao_fato = f"[Natureza: {natureza}] \n{request.form['descricao']}"
+
         flash('Auto atualizado.', 'success')
         return redirect(url_for('autos'))
-    return render_template('cadastrar_auto.html', auto=auto, crimes=crimes)
+
+    versao = db.session.query(AutoPrisao.versao).filter_by(id=id).scalar()
+    if versao is None:
+        abort(404)
+    # O formulário lista o catálogo de crimes, que muda sem mexer na versão do auto
+    crimes = assinatura_tabela(Crime.id, Crime.nome, Crime.artigo)
+    return responder_condicional(f"auto{id}.{versao}.c{crimes}", lambda: render_template(
+        'cadastrar_auto.html', auto=AutoPrisao.query.get(id), crimes=Crime.query.all()))
 
 # --- MÓDULO: MEMBROS E PERFIL ---
 
+MEMBROS_POR_PAGINA = 30
+
 @app.route('/membros')
 @login_required
 def gerenciar_membros():
-    usuarios = Usuario.query.all()
-    return render_template('gerenciar_membros.html', usuarios=usuarios)
+    filtros = {
+        'q': request.args.get('q', '').strip(),
+        'cargo': request.args.get('cargo', type=int),
+        'nivel': request.args.get('nivel', type=int),
+        'delegacia': request.args.get('delegacia', type=int),
+        'departamento': request.args.get('departamento', '').strip(),
+    }
+
+    # Delegacia e departamento valem também para o efetivo por cargo
+    def lotacao(query, departamento=True):
+        if filtros['delegacia']:
+            query = query.filter(Usuario.delegacia_id == filtros['delegacia'])
+        if departamento and filtros['departamento']:
+            query = query.filter(Usuario.departamento == filtros['departamento'])
+        return query
+
+    # Cargo no mesmo SELECT (nada de lazy load por linha do template)
+    query = lotacao(Usuario.query.outerjoin(Usuario.cargo_obj)) \
+        .options(db.contains_eager(Usuario.cargo_obj), db.joinedload(Usuario.delegacia_obj))
+    if filtros['q']:
+        # Prefixo do nome (índice NOCASE) ou matrícula exata (índice único)
+        query = query.filter(db.or_(Usuario.nome.like(prefixo_like(filtros['q']), escape='/'),
+                                    Usuario.matricula == filtros['q']))
+    if filtros['cargo']:
+        query = query.filter(Usuario.cargo_id == filtros['cargo'])
+    if filtros['nivel']:
+        query = query.filter(Cargo.nivel == filtros['nivel'])
+    paginacao = query.order_by(Usuario.nome) \
+        .paginate(page=request.args.get('page', 1, type=int), per_page=MEMBROS_POR_PAGINA, error_out=False)
+
+    # Efetivo por cargo em um único GROUP BY
+    efetivo = lotacao(db.session.query(Cargo.id, Cargo.nome, Cargo.nivel, db.func.count(Usuario.id))
+                      .outerjoin(Usuario, Usuario.cargo_id == Cargo.id)) \
+        .group_by(Cargo.id, Cargo.nome, Cargo.nivel).order_by(Cargo.nivel.desc(), Cargo.nome).all()
+    departamentos = [d for (d,) in lotacao(db.session.query(Usuario.departamento), departamento=False)
+                     .filter(Usuario.departamento.isnot(None), Usuario.departamento != '')
+                     .distinct().order_by(Usuario.departamento)]
+
+    return render_template('gerenciar_membros.html', usuarios=paginacao.items, paginacao=paginacao,
+                           filtros=filtros, efetivo=efetivo, departamentos=departamentos,
+                           niveis=sorted({nivel for _, _, nivel, _ in efetivo}, reverse=True))
 
 @app.route('/perfil/<int:id>')
 @login_required
 def perfil_usuario(id):
+    versao = db.session.query(Usuario.versao).filter_by(id=id).scalar()
+    if versao is None:
+        abort(404)
+    # Nome do cargo e o select de promoção vêm da tabela cargos, que não tem versão própria
+    cargos = assinatura_tabela(Cargo.id, Cargo.nome, Cargo.nivel)
+    return responder_condicional(f"perfil{id}.{versao}.c{cargos}", lambda: _renderizar_perfil(id))
+
+def _renderizar_perfil(id):
     usuario = Usuario.query.get_or_404(id)
     promocoes = Promocao.query.filter_by(usuario_id=id).order_by(Promocao.data_promocao.desc()).all()
     advertencias = Advertencia.query.filter_by(usuario_id=id).order_by(Advertencia.data_aplicacao.desc()).all()
     cargos = Cargo.query.order_by(Cargo.nivel.desc()).all()
-    return render_template('perfil_usuario.html', usuario=usuario, promocoes=promocoes, advertencias=advertencias, cargos=cargos)
+
+    # Carga de trabalho: consultas pelo índice (policial_responsavel_id, status/horario)
+    por_status = dict(db.session.query(Boletim.status, db.func.count(Boletim.id))
+                      .filter(Boletim.policial_responsavel_id == id).group_by(Boletim.status).all())
+    carga = {
+        'bo_pendentes': por_status.get('Pendente', 0),
+        'bo_concluidos': por_status.get('Concluído', 0)
+                         + BoletimArquivado.query.filter_by(policial_responsavel_id=id).count(),
+        'autos': AutoPrisao.query.filter_by(policial_responsavel_id=id).count()
+                 + AutoPrisaoArquivado.query.filter_by(policial_responsavel_id=id).count(),
+        'casos_abertos': Boletim.query.filter_by(policial_responsavel_id=id, status='Pendente')
+                                      .order_by(Boletim.data.desc()).limit(5).all(),
+        'ultimos_autos': AutoPrisao.query.filter_by(policial_responsavel_id=id)
+                                         .order_by(AutoPrisao.horario.desc()).limit(5).all()
+    }
+    return render_template('perfil_usuario.html', usuario=usuario, promocoes=promocoes, advertencias=advertencias, cargos=cargos, carga=carga)
 
 @app.route('/membros/cadastrar', methods=['GET','POST'])
 @login_required
@@ -405,34 +754,34 @@ def cadastrar_membros():
             flash('Você não tem permissão para cadastrar este nível de patente.', 'danger')
             return render_template('cadastrar_membros.html', cargos=cargos)
 
+        foto_filename = 'default.jpg'
+        if 'foto_perfil' in request.files:
+            file = request.files['foto_perfil']
+            if file and allowed_file(file.filename):
+                filename = secure_filename(file.filename)
+                foto_filename = salvar_arquivo(file, 'fotos_perfil', filename)
+
+        u = Usuario(
+            nome=request.form['nome'], 
+            matricula=request.form['matricula'], 
+            senha=generate_password_hash(request.form['senha']), 
+            cargo_id=cargo_id, 
+            foto_perfil=foto_filename, 
+            delegacia_id=delegacia_do_formulario(), 
+            departamento=request.form.get('departamento'), 
+            endereco=request.form.get('endereco'), 
+            observacoes=request.form.get('observacoes')
+        )
         try:
-            foto_filename = 'default.jpg'
-            if 'foto_perfil' in request.files:
-                file = request.files['foto_perfil']
-                if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    foto_filename = filename
-
-            u = Usuario(
-                nome=request.form['nome'], 
-                matricula=request.form['matricula'], 
-                senha=generate_password_hash(request.form['senha']), 
-                cargo_id=cargo_id, 
-                foto_perfil=foto_filename, 
-                delegacia=request.form.get('delegacia'), 
-                departamento=request.form.get('departamento'), 
-                endereco=request.form.get('endereco'), 
-                observacoes=request.form.get('observacoes')
-            )
-            db.session.add(u)
-            db.session.commit()
+            with db.session.begin_nested():
+                db.session.add(u)
+        except IntegrityError:
+            flash('Erro ao cadastrar: matrícula já existente.', 'danger')
+        else:
+            notificar_contadores(u.delegacia_id, efetivo_ativo=1)
             registrar_log('Cadastro Membro', u.nome, f'Matrícula {u.matricula}')
             flash('Membro cadastrado.', 'success')
             return redirect(url_for('gerenciar_membros'))
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Erro ao cadastrar: {str(e)}', 'danger')
             
     return render_template('cadastrar_membros.html', cargos=cargos)
 
@@ -467,7 +816,7 @@ def editar_membro(id):
             db.session.add(promocao)
             usuario.cargo_id = novo_cargo_id
         
-        usuario.delegacia = request.form['delegacia']
+        usuario.delegacia_id = delegacia_do_formulario(usuario.delegacia_id)
         usuario.departamento = request.form['departamento']
         usuario.endereco = request.form['endereco']
         usuario.observacoes = request.form['observacoes']
@@ -479,10 +828,8 @@ def editar_membro(id):
             file = request.files['foto_perfil']
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                usuario.foto_perfil = filename
+                usuario.foto_perfil = salvar_arquivo(file, 'fotos_perfil', filename)
                 
-        db.session.commit()
         registrar_log('Edição de Perfil', usuario.nome)
         flash('Ficha atualizada.', 'success')
         return redirect(url_for('perfil_usuario', id=usuario.id))
@@ -513,7 +860,6 @@ def adicionar_promocao(id):
     usuario.cargo_id = novo_cargo_id
     
     db.session.add(promo)
-    db.session.commit()
     registrar_log('Promoção Registrada', usuario.nome, cargo_novo.nome)
     flash('Promoção registrada com sucesso.', 'success')
     return redirect(url_for('perfil_usuario', id=id))
@@ -533,7 +879,6 @@ def aplicar_advertencia(id):
         descricao=request.form['descricao']
     )
     db.session.add(adv)
-    db.session.commit()
     registrar_log('Aplicação de Advertência', usuario.nome, request.form['tipo'])
     flash('Registro disciplinar adicionado.', 'warning')
     return redirect(url_for('perfil_usuario', id=id))
@@ -547,8 +892,13 @@ def excluir_membro(id):
         return redirect(url_for('gerenciar_membros'))
         
     nome_removido = usuario.nome
+    # Fotos são salvas com o nome original e podem ser compartilhadas (inclusive com outra delegacia)
+    if not Usuario.query.filter(Usuario.foto_perfil == usuario.foto_perfil, Usuario.id != usuario.id) \
+            .execution_options(todas_delegacias=True).first():
+        descartar_arquivo('fotos_perfil', usuario.foto_perfil)
+    TokenApi.query.filter_by(usuario_id=usuario.id).update({'ativo': False})
     db.session.delete(usuario)
-    db.session.commit()
+    notificar_contadores(usuario.delegacia_id, efetivo_ativo=-1)
     registrar_log('Exclusão de Membro', nome_removido)
     flash('Membro removido.', 'success')
     return redirect(url_for('gerenciar_membros'))
@@ -575,11 +925,66 @@ def adicionar_cargo():
     else:
         c = Cargo(nome=request.form['nome'], nivel=int(request.form['nivel']))
         db.session.add(c)
-        db.session.commit()
         registrar_log('Criar Cargo', c.nome)
         flash('Cargo criado com sucesso.', 'success')
     return redirect(url_for('gerenciar_cargos'))
 
+# --- ESTATÍSTICAS (CHEFIA) ---
+
+@app.route('/estatisticas')
+@login_required
+def estatisticas():
+    if current_user().nivel_hierarquico < 80:
+        flash('Acesso restrito à chefia.', 'danger')
+        return redirect(url_for('dashboard'))
+    # Atualização incremental: só agrega o que entrou desde a última marca
+    # Estatísticas são do estado inteiro, independente da delegacia em foco
+    with sem_escopo():
+        atualizar_estatisticas()
+        return render_template('estatisticas.html', painel=painel_estatisticas())
+
+# --- AUDITORIA (CHEFIA) ---
+
+@app.route('/auditoria')
+@login_required
+def auditoria():
+    if current_user().nivel_hierarquico < 80:
+        flash('Acesso restrito à chefia.', 'danger')
+        return redirect(url_for('dashboard'))
+
+    filtros = {
+        'autor': request.args.get('autor', type=int),
+        'acao': request.args.get('acao') or None,
+        'de': request.args.get('de') or None,
+        'ate': request.args.get('ate') or None,
+        'mes': request.args.get('mes') or None
+    }
+    pagina = request.args.get('page', 1, type=int)
+    por_pagina = 50
+
+    if filtros['mes']:
+        # Mês já compactado: lê do arquivo gzip
+        logs, total, ha_mais = ler_arquivo(filtros['mes'], filtros['autor'], filtros['acao'], pagina, por_pagina)
+        # Com filtro o total do mês não é contado (a leitura para na página pedida)
+        paginas = pagina + ha_mais if total is None else max(1, -(-total // por_pagina))
+    else:
+        try:
+            de = datetime.strptime(filtros['de'], '%Y-%m-%d') if filtros['de'] else None
+            ate = datetime.strptime(filtros['ate'], '%Y-%m-%d') + timedelta(days=1) if filtros['ate'] else None
+        except ValueError:
+            flash('Data inválida.', 'danger')
+            de = ate = None
+        paginacao = consultar_logs(filtros['autor'], filtros['acao'], de, ate) \
+            .paginate(page=pagina, per_page=por_pagina, error_out=False)
+        logs, total, paginas = paginacao.items, paginacao.total, max(1, paginacao.pages)
+
+    return render_template('auditoria.html',
+                           logs=logs, total=total, pagina=pagina, paginas=paginas,
+                           filtros=filtros,
+                           usuarios=Usuario.query.order_by(Usuario.nome).all(),
+                           acoes=[a for (a,) in db.session.query(LogAtividade.acao).distinct().order_by(LogAtividade.acao)],
+                           arquivos=ArquivoAuditoria.query.order_by(ArquivoAuditoria.mes.desc()).all())
+
 # --- MÓDULO: ARMARIA ---
 
 @app.route('/armaria')
@@ -587,7 +992,7 @@ def adicionar_cargo():
 def armaria():
     acervo = request.args.get('acervo')
     armas = Arma.query.filter_by(acervo=acervo).all() if acervo else Arma.query.all()
-    return render_template('armaria.html', armas=armas, filtro_atual=acervo)
+    return render_template('armaria.html', armas=armas, filtro_atual=acervo, agora=datetime.utcnow())
 
 @app.route('/armaria/cadastrar', methods=['GET', 'POST'])
 @login_required
@@ -609,28 +1014,24 @@ def cadastrar_arma():
             boletim_id=request.form.get('boletim_id') or None,
             auto_prisao_id=request.form.get('auto_prisao_id') or None
         )
+        # Item e movimentação de entrada gravados juntos: nunca fica item sem histórico
+        nova_arma.historico.append(MovimentacaoArma(
+            usuario_responsavel_id=current_user().id,
+            tipo_movimentacao='Entrada',
+            destinatario='Estoque',
+            observacao='Cadastro Inicial'
+        ))
         try:
-            db.session.add(nova_arma)
-            db.session.commit()
-            
-            log = MovimentacaoArma(
-                arma_id=nova_arma.id,
-                usuario_responsavel_id=current_user().id,
-                tipo_movimentacao='Entrada',
-                destinatario='Estoque',
-                observacao='Cadastro Inicial'
-            )
-            db.session.add(log)
-            db.session.commit()
-            
+            with db.session.begin_nested():
+                db.session.add(nova_arma)
+        except SQLAlchemyError as e:
+            flash(f'Erro: {str(e)}', 'danger')
+        else:
             if request.form.get('boletim_id'): return redirect(url_for('detalhes_boletim', id=request.form['boletim_id']))
             if request.form.get('auto_prisao_id'): return redirect(url_for('editar_auto', id=request.form['auto_prisao_id']))
             
             flash('Item cadastrado.', 'success')
             return redirect(url_for('armaria'))
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Erro: {str(e)}', 'danger')
 
     boletins = Boletim.query.order_by(Boletim.id.desc()).limit(20).all()
     autos = AutoPrisao.query.order_by(AutoPrisao.id.desc()).limit(20).all()
@@ -653,33 +1054,62 @@ def movimentar_arma(id):
         if not dest:
             dest = request.form.get('destinatario') 
 
+        # Prazo opcional (campo datetime-local, no fuso FUSO_HORARIO) gravado em UTC como as demais datas
+        devolver_ate = None
+        if tipo == 'Retirada' and request.form.get('devolver_ate'):
+            try:
+                devolver_ate = local_para_utc(datetime.fromisoformat(request.form['devolver_ate']))
+            except ValueError:
+                flash('Prazo de devolução inválido.', 'danger')
+                return render_template('movimentar_arma.html', arma=arma, oficiais=oficiais)
+
+        em_cautela_antes = arma.status in ('Em Uso', 'Transito')
         if tipo == 'Retirada':
             arma.status = 'Em Uso' if arma.acervo == 'Patrimonio' else 'Transito'
             arma.localizacao_atual = dest
+            abrir_cautela(arma, devolver_ate)
         elif tipo == 'Devolucao':
             arma.status = 'Disponivel' if arma.acervo == 'Patrimonio' else 'Custodia'
             arma.localizacao_atual = 'Armário Central'
+            fechar_cautela(arma)
             
         log = MovimentacaoArma(
             arma_id=arma.id, 
             usuario_responsavel_id=current_user().id, 
             tipo_movimentacao=tipo, 
             destinatario=dest, 
+            devolver_ate=devolver_ate,
             observacao=request.form['observacao']
         )
         db.session.add(log)
-        db.session.commit()
+        notificar_contadores(arma.delegacia_id, armas_cautela=(arma.status in ('Em Uso', 'Transito')) - em_cautela_antes)
         flash('Movimentação registrada.', 'success')
         return redirect(url_for('armaria'))
         
     return render_template('movimentar_arma.html', arma=arma, oficiais=oficiais)
 
+@app.route('/armaria/cautelas-vencidas')
+@login_required
+def armaria_cautelas_vencidas():
+    agora = datetime.utcnow()
+    return jsonify([{'id': a.id, 'acervo': a.acervo, 'tipo': a.tipo, 'modelo': a.modelo,
+                     'numero_serie': a.numero_serie, 'com': a.localizacao_atual,
+                     'devolver_ate': a.cautela_ate.replace(tzinfo=timezone.utc).isoformat(),
+                     'atraso_minutos': int((agora - a.cautela_ate).total_seconds() // 60)}
+                    for a in cautelas_vencidas(agora)])
+
 @app.route('/armaria/historico/<int:id>')
 @login_required
 def historico_arma(id):
-    arma = Arma.query.get_or_404(id)
-    historico = MovimentacaoArma.query.filter_by(arma_id=id).order_by(MovimentacaoArma.data_movimentacao.desc()).all()
-    return render_template('historico_arma.html', arma=arma, historico=historico)
+    versao = db.session.query(Arma.versao).filter_by(id=id).scalar()
+    if versao is None:
+        abort(404)
+
+    def renderizar():
+        arma = Arma.query.get_or_404(id)
+        historico = MovimentacaoArma.query.filter_by(arma_id=id).order_by(MovimentacaoArma.data_movimentacao.desc()).all()
+        return render_template('historico_arma.html', arma=arma, historico=historico)
+    return responder_condicional(f"arma{id}.{versao}", renderizar)
 
 # --- MÓDULO: ACADEPOL ---
 
@@ -707,8 +1137,7 @@ def acadepol_publicar():
             file = request.files['anexo']
             if file and allowed_file(file.filename):
                 filename = secure_filename(f"acad_{datetime.now().timestamp()}_{file.filename}")
-                file.save(os.path.join(app.config['EVIDENCE_FOLDER'], filename))
-                arquivo_nome = filename
+                arquivo_nome = salvar_arquivo(file, 'evidencias', filename)
 
         comunicado = Comunicado(
             titulo=request.form['titulo'],
@@ -718,7 +1147,6 @@ def acadepol_publicar():
             autor_id=current_user().id
         )
         db.session.add(comunicado)
-        db.session.commit()
         flash('Publicado com sucesso.', 'success')
         return redirect(url_for('acadepol_admin'))
     return render_template('acadepol_form.html')
@@ -727,11 +1155,74 @@ def acadepol_publicar():
 @login_required
 def acadepol_excluir(id):
     c = Comunicado.query.get_or_404(id)
+    descartar_arquivo('evidencias', c.arquivo_anexo)
     db.session.delete(c)
-    db.session.commit()
     flash('Publicação removida.', 'success')
     return redirect(url_for('acadepol_admin'))
 
+# --- API JSON (v1) ---
+
+@app.errorhandler(api.ErroApi)
+def erro_api(e):
+    return jsonify(erro=e.mensagem), e.status
+
+@app.route('/api/v1/pessoas')
+@api_token_required
+def api_pessoas():
+    query = Pessoa.query
+    if request.args.get('rg'):
+        query = query.filter(Pessoa.rg == request.args['rg'])
+    if request.args.get('nome'):
+        query = query.filter(Pessoa.nome.like(prefixo_like(request.args['nome']), escape='/'))
+    return jsonify(api.listar('pessoas', query))
+
+@app.route('/api/v1/pessoas/<int:id>')
+@api_token_required
+def api_pessoa(id):
+    return jsonify(api.detalhar('pessoas', id))
+
+@app.route('/api/v1/boletins')
+@api_token_required
+def api_boletins():
+    query = Boletim.query
+    if request.args.get('status'):
+        query = query.filter(Boletim.status == request.args['status'])
+    if request.args.get('crime', type=int):
+        query = query.join(Boletim.crimes).filter(Crime.id == request.args.get('crime', type=int))
+    return jsonify(api.listar('boletins', query))
+
+@app.route('/api/v1/boletins/<int:id>')
+@api_token_required
+def api_boletim(id):
+    return jsonify(api.detalhar('boletins', id))
+
+@app.route('/api/v1/autos')
+@api_token_required
+def api_autos():
+    query = AutoPrisao.query
+    if request.args.get('preso'):
+        query = query.filter(AutoPrisao.preso.like(prefixo_like(request.args['preso']), escape='/'))
+    return jsonify(api.listar('autos', query))
+
+@app.route('/api/v1/autos/<int:id>')
+@api_token_required
+def api_auto(id):
+    return jsonify(api.detalhar('autos', id))
+
+@app.route('/api/v1/armas')
+@api_token_required
+def api_armas():
+    query = Arma.query
+    for campo in ('status', 'acervo', 'numero_serie'):
+        if request.args.get(campo):
+            query = query.filter(getattr(Arma, campo) == request.args[campo])
+    return jsonify(api.listar('armas', query))
+
+@app.route('/api/v1/armas/<int:id>')
+@api_token_required
+def api_arma(id):
+    return jsonify(api.detalhar('armas', id))
+
 # --- ROTA DE ARQUIVOS ---
 @app.route('/evidencias/<filename>')
 @login_required
@@ -742,7 +1233,9 @@ def baixar_evidencia(filename):
 if __name__ == '__main__':
     app.secret_key = Config.SECRET_KEY
     with app.app_context():
-        db.create_all()
+        atualizar_esquema()
+        vincular_delegacias()
+        busca.atualizar_delegacias()
         
         if not Cargo.query.first():
             cargos_iniciais = [
@@ -765,7 +1258,8 @@ if __name__ == '__main__':
             if admin_cargo and not Usuario.query.filter_by(matricula='admin').first():
                 admin = Usuario(
                     nome="Administrador Sistema", matricula="admin", senha=generate_password_hash("admin"), 
-                    cargo_id=admin_cargo.id, delegacia="DGP - Geral", departamento="Tecnologia da Informação"
+                    cargo_id=admin_cargo.id, delegacia_id=obter_delegacia(app.config['DELEGACIA_PADRAO']).id,
+                    departamento="Tecnologia da Informação"
                 )
                 db.session.add(admin)
                 db.session.commit()
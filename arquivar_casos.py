@@ -0,0 +1,18 @@
+# Arquivo: arquivar_casos.py
+# Move B.O.s concluídos e autos de prisão antigos para o arquivo morto.
+# Prazos padrão em config.py (ARQUIVO_DIAS_BOLETINS / ARQUIVO_DIAS_AUTOS).
+# Uso: python arquivar_casos.py [dias_boletins] [dias_autos]
+import sys
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.arquivamento import arquivar_casos
+
+def executar(dias_boletins=None, dias_autos=None):
+    with app.app_context():
+        atualizar_esquema()
+        boletins, autos = arquivar_casos(dias_boletins, dias_autos)
+        print(f"Arquivados: {boletins} boletins, {autos} autos de prisão.")
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:3]]
+    executar(*argumentos)
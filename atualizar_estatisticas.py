@@ -0,0 +1,19 @@
+# Arquivo: atualizar_estatisticas.py
+# Atualiza os agregados de estatísticas (incremental). Use --recalcular para
+# apagar tudo e reconstruir a partir das tabelas de origem.
+import sys
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.estatisticas import atualizar_estatisticas, recalcular_estatisticas
+
+def executar(recalcular=False):
+    with app.app_context():
+        atualizar_esquema()
+        if recalcular:
+            recalcular_estatisticas()
+        else:
+            atualizar_estatisticas()
+        print("Estatísticas atualizadas.")
+
+if __name__ == "__main__":
+    executar(recalcular='--recalcular' in sys.argv)
@@ -0,0 +1,68 @@
+# Arquivo: benchmark_compressao.py
+# Mede, para as páginas mais pesadas, os bytes enviados sem compressão, com
+# gzip e (se o pacote brotli estiver instalado) com brotli, e o custo de CPU
+# por requisição de cada modo. Só faz GETs de leitura, logado como a matrícula
+# informada (padrão: admin).
+# Uso: python benchmark_compressao.py [matricula] [repeticoes]
+import sys
+import time
+from app import app
+from models.users import Usuario
+from servicos import compressao
+
+ROTAS = ['/dashboard', '/boletins', '/boletins/cadastrar', '/autos', '/armaria',
+         '/membros', '/pessoas', '/perfil/{id}']
+
+def _medir(cliente, rota, codificacao, repeticoes):
+    cabecalhos = {'Accept-Encoding': codificacao} if codificacao else {}
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        resposta = cliente.get(rota, headers=cabecalhos)
+        corpo = resposta.get_data()
+    cpu_ms = (time.process_time() - inicio) * 1000 / repeticoes
+    return resposta, len(corpo), cpu_ms
+
+def executar(matricula='admin', repeticoes=20):
+    app.config['AGENDADOR_ATIVO'] = False
+    with app.app_context():
+        usuario = Usuario.query.filter_by(matricula=matricula).first()
+        if not usuario:
+            print("Matrícula não encontrada.")
+            return
+        usuario_id = usuario.id
+
+    modos = [None, 'gzip'] + (['br'] if compressao.brotli else [])
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = usuario_id
+
+    print(f"{'rota':<22} {'modo':<9} {'bytes':>9} {'%':>6} {'CPU ms/req':>11} {'só compressão':>14}")
+    totais = {modo: 0 for modo in modos}
+    for rota in ROTAS:
+        rota = rota.format(id=usuario_id)
+        original = None
+        for modo in modos:
+            resposta, tamanho, cpu_ms = _medir(cliente, rota, modo, repeticoes)
+            if resposta.status_code != 200:
+                print(f"{rota:<22} HTTP {resposta.status_code}")
+                break
+            if modo is None:
+                original = resposta.get_data()
+                base, extra = tamanho, ''
+            else:
+                # Custo isolado de comprimir o mesmo corpo, sem o resto da requisição
+                inicio = time.process_time()
+                for _ in range(repeticoes):
+                    compressao.comprimir(original, modo)
+                extra = f"{(time.process_time() - inicio) * 1000 / repeticoes:.2f}"
+            totais[modo] += tamanho
+            print(f"{rota:<22} {modo or 'identity':<9} {tamanho:>9} {tamanho * 100 / base:>5.0f}% "
+                  f"{cpu_ms:>11.2f} {extra:>14}")
+
+    print()
+    for modo in modos:
+        print(f"Total {modo or 'identity':<9} {totais[modo]:>9} bytes")
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    executar(argumentos[0] if argumentos else 'admin', int(argumentos[1]) if len(argumentos) > 1 else 20)
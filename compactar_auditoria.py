@@ -0,0 +1,18 @@
+# Arquivo: compactar_auditoria.py
+# Move os meses antigos de logs_atividade para instance/auditoria/*.jsonl.gz.
+# Pensado para rodar periodicamente (ex: cron diário).
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.auditoria import compactar_auditoria
+
+def executar():
+    with app.app_context():
+        atualizar_esquema()
+        resumo = compactar_auditoria()
+        if not resumo:
+            print("Nada a compactar.")
+        for mes, total in sorted(resumo.items()):
+            print(f"{mes}: {total} registros arquivados.")
+
+if __name__ == "__main__":
+    executar()
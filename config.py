@@ -6,4 +6,39 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'troque_este_segredo')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
     'sqlite:///' + os.path.join(basedir, 'instance', 'database.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Auditoria: meses mantidos na tabela logs_atividade antes de ir para o arquivo
+    AUDITORIA_MESES_QUENTES = int(os.environ.get('AUDITORIA_MESES_QUENTES', 3))
+    AUDITORIA_DIR = os.environ.get('AUDITORIA_DIR') or os.path.join(basedir, 'instance', 'auditoria')
+
+    # Dossiês de B.O. (zip com relatório e anexos) gerados em segundo plano
+    DOSSIE_DIR = os.environ.get('DOSSIE_DIR') or os.path.join(basedir, 'instance', 'dossies')
+
+    # Arquivo morto: B.O.s concluídos e autos de prisão antigos saem das tabelas quentes
+    ARQUIVO_DIAS_BOLETINS = int(os.environ.get('ARQUIVO_DIAS_BOLETINS', 180))
+    ARQUIVO_DIAS_AUTOS = int(os.environ.get('ARQUIVO_DIAS_AUTOS', 365))
+
+    # Delegacias: cada servidor só vê casos, armaria e efetivo da própria lotação.
+    # A partir deste nível hierárquico (Delegado Geral) o acesso é a todas.
+    NIVEL_TODAS_DELEGACIAS = int(os.environ.get('NIVEL_TODAS_DELEGACIAS', 100))
+    # Lotação dada a registros antigos sem delegacia identificável
+    DELEGACIA_PADRAO = os.environ.get('DELEGACIA_PADRAO', 'DGP - Geral')
+
+    # Agendador interno (servicos/agendador.py), iniciado na primeira requisição
+    AGENDADOR_ATIVO = os.environ.get('AGENDADOR_ATIVO', '1') == '1'
+    # Intervalo da verificação de cautelas vencidas na armaria
+    CAUTELA_VERIFICAR_MINUTOS = int(os.environ.get('CAUTELA_VERIFICAR_MINUTOS', 5))
+    # Fuso dos prazos de devolução: o campo do formulário vem no horário local e é
+    # gravado em UTC (como as demais datas); na tela o prazo volta para este fuso
+    FUSO_HORARIO = os.environ.get('FUSO_HORARIO', 'America/Sao_Paulo')
+
+    # Limite de requisições nas rotas de escrita/upload (servicos/limites.py).
+    # Os baldes ficam num SQLite à parte, compartilhado pelos workers.
+    LIMITES_ATIVOS = os.environ.get('LIMITES_ATIVOS', '1') == '1'
+    LIMITES_DB = os.environ.get('LIMITES_DB') or os.path.join(basedir, 'instance', 'limites.db')
+    # Quantos proxies reversos à frente da aplicação repassam X-Forwarded-For
+    # (0 = acesso direto; o IP do cliente é o da conexão)
+    PROXIES_CONFIAVEIS = int(os.environ.get('PROXIES_CONFIAVEIS', 0))
+    # Uploads de anexos em andamento ao mesmo tempo, somando todos os workers
+    UPLOADS_SIMULTANEOS = int(os.environ.get('UPLOADS_SIMULTANEOS', 4))
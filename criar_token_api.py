@@ -0,0 +1,31 @@
+# Arquivo: criar_token_api.py
+# Gera um token para a API JSON (/api/v1). O token só é exibido uma vez.
+# Uso: python criar_token_api.py "MDT Viatura 12" <matricula do responsável>
+import hashlib
+import secrets
+import sys
+from app import app, db
+from models.users import Usuario
+from models.api import TokenApi
+from servicos.esquema import atualizar_esquema
+
+def criar_token(nome, matricula):
+    with app.app_context():
+        atualizar_esquema()
+        usuario = Usuario.query.filter_by(matricula=matricula).first()
+        if not usuario:
+            print("Matrícula não encontrada.")
+            return
+
+        token = secrets.token_urlsafe(32)
+        db.session.add(TokenApi(nome=nome, usuario_id=usuario.id,
+                                token_hash=hashlib.sha256(token.encode()).hexdigest()))
+        db.session.commit()
+        print(f"Token criado para '{nome}' (responsável: {usuario.nome}):")
+        print(token)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print('Uso: python criar_token_api.py "<nome da integração>" <matricula>')
+    else:
+        criar_token(sys.argv[1], sys.argv[2])
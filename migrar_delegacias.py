@@ -0,0 +1,22 @@
+# Arquivo: migrar_delegacias.py
+# Cria as delegacias a partir do texto livre de lotação dos servidores e
+# preenche delegacia_id de usuários, B.O.s, autos de prisão e armaria
+# (inclusive no arquivo morto). Pode ser executado de novo sem efeito colateral.
+# Uso: python migrar_delegacias.py
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.delegacias import vincular_delegacias
+from servicos.busca import atualizar_delegacias
+
+def executar():
+    with app.app_context():
+        atualizar_esquema()
+        totais = vincular_delegacias()
+        for tabela, total in totais.items():
+            if total:
+                print(f"  {tabela:<25} {total} registros vinculados")
+        atualizar_delegacias()  # B.O.s e autos vinculados acima, no índice de busca
+        print("Delegacias vinculadas.")
+
+if __name__ == "__main__":
+    executar()
@@ -0,0 +1,21 @@
+from db import db
+from datetime import datetime
+
+class TokenApi(db.Model):
+    # Credencial das integrações (/api/v1): terminais das viaturas, fórum, etc.
+    __tablename__ = 'tokens_api'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)  # Ex: 'MDT Viatura 12', 'Integração TJ'
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)  # sha256 do token; o token em si não é guardado
+
+    # As consultas são registradas em nome deste servidor
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    ativo = db.Column(db.Boolean, default=True)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    ultimo_uso = db.Column(db.DateTime)
+
+    usuario = db.relationship('Usuario')
+
+    def __repr__(self):
+        return f'<TokenApi {self.nome}>'
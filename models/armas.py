@@ -19,6 +19,12 @@ class Arma(db.Model):
     # Estado Atual
     status = db.Column(db.String(20), default='Disponivel')
     localizacao_atual = db.Column(db.String(100))
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True)
+
+    # Cautela aberta: prazo de devolução da última Retirada (NULL se não há prazo
+    # ou o item está no armário) e se o atraso já virou aviso (servicos/custodia.py)
+    cautela_ate = db.Column(db.DateTime, nullable=True)
+    cautela_avisada = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
     
     # VÍNCULOS (Chaves Estrangeiras)
     boletim_id = db.Column(db.Integer, db.ForeignKey('boletins.id'), nullable=True)
@@ -26,10 +32,26 @@ class Arma(db.Model):
     
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Sobe também a cada MovimentacaoArma (servicos/versoes.py)
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
     # Relacionamentos para acesso fácil no template
     boletim = db.relationship('Boletim', backref=db.backref('itens_apreendidos', lazy=True))
     auto_prisao = db.relationship('AutoPrisao', backref=db.backref('itens_apreendidos', lazy=True))
 
+    __table_args__ = (
+        # Acervo e itens em cautela de cada delegacia
+        db.Index('ix_armas_delegacia_acervo', 'delegacia_id', 'acervo'),
+        db.Index('ix_armas_delegacia_status', 'delegacia_id', 'status'),
+        # Índices parciais: só as cautelas com prazo, do tamanho do que está fora do armário.
+        # O primeiro atende o agendador (todas as delegacias), o segundo o painel de cada uma.
+        db.Index('ix_armas_cautela_aberta', 'cautela_ate',
+                 sqlite_where=db.text('cautela_ate IS NOT NULL')),
+        db.Index('ix_armas_delegacia_cautela', 'delegacia_id', 'cautela_ate',
+                 sqlite_where=db.text('cautela_ate IS NOT NULL')),
+    )
+
     def __repr__(self):
         return f'<Item {self.tipo} - {self.modelo}>'
 
@@ -42,6 +64,7 @@ class MovimentacaoArma(db.Model):
     tipo_movimentacao = db.Column(db.String(20))
     destinatario = db.Column(db.String(150)) 
     data_movimentacao = db.Column(db.DateTime, default=datetime.utcnow)
+    devolver_ate = db.Column(db.DateTime, nullable=True)  # Prazo opcional de uma Retirada
     observacao = db.Column(db.Text)
 
     arma = db.relationship('Arma', backref=db.backref('historico', lazy=True))
@@ -0,0 +1,101 @@
+from db import db
+from datetime import datetime
+
+# Arquivo morto: casos encerrados saem das tabelas quentes (boletins,
+# autos_prisao, anexos_boletim e vínculos de crimes) para estas tabelas,
+# mantendo o mesmo id. Ver servicos/arquivamento.py.
+
+boletins_crimes_arquivo = db.Table(
+    'boletins_crimes_arquivo',
+    db.Column('boletim_id', db.Integer, db.ForeignKey('boletins_arquivo.id'), primary_key=True),
+    db.Column('crime_id', db.Integer, db.ForeignKey('crimes.id'), primary_key=True)
+)
+
+autos_crimes_arquivo = db.Table(
+    'autos_crimes_arquivo',
+    db.Column('auto_prisao_id', db.Integer, db.ForeignKey('autos_prisao_arquivo.id'), primary_key=True),
+    db.Column('crime_id', db.Integer, db.ForeignKey('crimes.id'), primary_key=True)
+)
+
+class BoletimArquivado(db.Model):
+    __tablename__ = 'boletins_arquivo'
+
+    arquivado = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    data = db.Column(db.DateTime)
+    autor = db.Column(db.String(120))
+    vitima = db.Column(db.String(120))
+    descricao = db.Column(db.Text)
+    policial_responsavel = db.Column(db.String(120))
+    policial_responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True)
+    status = db.Column(db.String(20))
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True)
+    arquivo_evidencia = db.Column(db.String(200), nullable=True)
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atualizado_em = db.Column(db.DateTime)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    anexos = db.relationship('AnexoBoletimArquivado', lazy=True)
+    policial = db.relationship('Usuario', foreign_keys=[policial_responsavel_id])
+    crimes = db.relationship('Crime', secondary='boletins_crimes_arquivo', lazy=True)
+    # Itens da armaria continuam apontando para o mesmo boletim_id
+    itens_apreendidos = db.relationship('Arma', primaryjoin='foreign(Arma.boletim_id) == BoletimArquivado.id',
+                                        viewonly=True, lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_boletins_arquivo_delegacia_data', 'delegacia_id', 'data'),
+    )
+
+    @property
+    def nome_policial(self):
+        return self.policial.nome if self.policial else self.policial_responsavel
+
+    @property
+    def numero_formatado(self):
+        return f"B.O Nº {self.id:03d}/{self.data.year}"
+
+    def __repr__(self):
+        return f'<BoletimArquivado {self.id}>'
+
+class AnexoBoletimArquivado(db.Model):
+    __tablename__ = 'anexos_boletim_arquivo'
+
+    id = db.Column(db.Integer, primary_key=True)
+    boletim_id = db.Column(db.Integer, db.ForeignKey('boletins_arquivo.id'), nullable=False, index=True)
+    arquivo = db.Column(db.String(200), nullable=False)
+    tipo = db.Column(db.String(20))
+    criado_em = db.Column(db.DateTime)
+
+class AutoPrisaoArquivado(db.Model):
+    __tablename__ = 'autos_prisao_arquivo'
+
+    arquivado = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    preso = db.Column(db.String(120), nullable=False)
+    descricao_fato = db.Column(db.Text, nullable=False)
+    testemunhas = db.Column(db.Text)
+    policial_responsavel = db.Column(db.String(120), nullable=False)
+    policial_responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True)
+    horario = db.Column(db.DateTime, index=True)
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True)
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atualizado_em = db.Column(db.DateTime)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    policial = db.relationship('Usuario', foreign_keys=[policial_responsavel_id])
+    crimes = db.relationship('Crime', secondary='autos_crimes_arquivo', lazy=True)
+    itens_apreendidos = db.relationship('Arma', primaryjoin='foreign(Arma.auto_prisao_id) == AutoPrisaoArquivado.id',
+                                        viewonly=True, lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_autos_prisao_arquivo_delegacia_horario', 'delegacia_id', 'horario'),
+    )
+
+    @property
+    def nome_policial(self):
+        return self.policial.nome if self.policial else self.policial_responsavel
+
+    def __repr__(self):
+        return f'<AutoPrisaoArquivado {self.id}>'
@@ -0,0 +1,15 @@
+from db import db
+from datetime import datetime
+
+class ArquivoAuditoria(db.Model):
+    # Catálogo dos meses de logs_atividade já compactados em disco
+    __tablename__ = 'auditoria_arquivos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.String(7), unique=True, nullable=False) # 'AAAA-MM'
+    arquivo = db.Column(db.String(200), nullable=False)        # Ex: logs_2025-01.jsonl.gz
+    total_registros = db.Column(db.Integer, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArquivoAuditoria {self.mes}>'
@@ -4,16 +4,39 @@ from datetime import datetime
 class AutoPrisao(db.Model):
     # ADICIONE ESTA LINHA OBRIGATORIAMENTE
     __tablename__ = 'autos_prisao' 
+    arquivado = False  # ver models/arquivo.py
     
     id = db.Column(db.Integer, primary_key=True)
     preso = db.Column(db.String(120), nullable=False)
     descricao_fato = db.Column(db.Text, nullable=False)
     testemunhas = db.Column(db.Text)
-    policial_responsavel = db.Column(db.String(120), nullable=False)
-    horario = db.Column(db.DateTime, default=datetime.utcnow)
+    policial_responsavel = db.Column(db.String(120), nullable=False) # Nome no momento do registro (legado)
+    policial_responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
+    horario = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True)
+
+    # Controle de versão para o ETag de editar_auto
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    policial = db.relationship('Usuario', foreign_keys=[policial_responsavel_id])
+
+    # Tipificação estruturada (tabela autos_crimes)
+    crimes = db.relationship('Crime', secondary='autos_crimes', lazy=True,
+                             backref=db.backref('autos_prisao', lazy='dynamic'))
 
     # Relacionamento (Opcional, mas útil se quiser acessar as armas a partir da prisão)
     # armas = db.relationship('Armas', backref='auto_prisao', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_autos_prisao_policial_horario', 'policial_responsavel_id', 'horario'),
+        db.Index('ix_autos_prisao_delegacia_horario', 'delegacia_id', 'horario'),
+        db.Index('ix_autos_prisao_preso_nocase', preso.collate('NOCASE')),
+    )
+
+    @property
+    def nome_policial(self):
+        return self.policial.nome if self.policial else self.policial_responsavel
+
     def __repr__(self):
         return f'<AutoPrisao {self.id}>'
\ No newline at end of file
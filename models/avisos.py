@@ -10,6 +10,8 @@ class Aviso(db.Model):
     prioridade = db.Column(db.String(20), default='Normal') # 'Alta' ou 'Normal'
     
     autor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    # Aviso de uma delegacia só (ex: cautela vencida); vazio = mural de todas
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True, index=True)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     
     autor = db.relationship('Usuario')
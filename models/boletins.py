@@ -3,23 +3,49 @@ from datetime import datetime
 
 class Boletim(db.Model):
     __tablename__ = 'boletins'
+    arquivado = False  # ver models/arquivo.py
 
     id = db.Column(db.Integer, primary_key=True)
-    data = db.Column(db.DateTime, default=datetime.utcnow)
+    data = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     autor = db.Column(db.String(120))
     vitima = db.Column(db.String(120))
     descricao = db.Column(db.Text)
-    policial_responsavel = db.Column(db.String(120))
+    policial_responsavel = db.Column(db.String(120)) # Nome no momento do registro (legado)
+    policial_responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
     
     status = db.Column(db.String(20), default='Pendente')
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True)
     
     # Mantemos este campo para compatibilidade ou como "Capa do B.O."
     arquivo_evidencia = db.Column(db.String(200), nullable=True)
 
+    # Versão da linha (inclui mudanças em registros filhos); usada no ETag das páginas
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
     # Relacionamento com Múltiplos Anexos
     anexos = db.relationship('AnexoBoletim', backref='boletim', lazy=True)
 
+    policial = db.relationship('Usuario', foreign_keys=[policial_responsavel_id])
+
+    # Tipificação estruturada (tabela boletins_crimes)
+    crimes = db.relationship('Crime', secondary='boletins_crimes', lazy=True,
+                             backref=db.backref('boletins', lazy='dynamic'))
+
+    __table_args__ = (
+        # Carga de trabalho por policial ("meus casos" pendentes/concluídos)
+        db.Index('ix_boletins_policial_status', 'policial_responsavel_id', 'status'),
+        # Listagem e contadores de cada delegacia (servicos/delegacias.py)
+        db.Index('ix_boletins_delegacia_data', 'delegacia_id', 'data'),
+        db.Index('ix_boletins_delegacia_status', 'delegacia_id', 'status'),
+    )
+
+    @property
+    def nome_policial(self):
+        # Nome atual do oficial; o texto antigo só vale para registros sem vínculo
+        return self.policial.nome if self.policial else self.policial_responsavel
+
     @property
     def numero_formatado(self):
         ano = self.data.year
@@ -1,5 +1,21 @@
 from db import db
 
+# Vínculos estruturados entre ocorrências/prisões e a tipificação penal.
+# O índice (crime_id, ...) atende consultas do tipo "roubos deste mês".
+boletins_crimes = db.Table(
+    'boletins_crimes',
+    db.Column('boletim_id', db.Integer, db.ForeignKey('boletins.id'), primary_key=True),
+    db.Column('crime_id', db.Integer, db.ForeignKey('crimes.id'), primary_key=True),
+    db.Index('ix_boletins_crimes_crime', 'crime_id', 'boletim_id')
+)
+
+autos_crimes = db.Table(
+    'autos_crimes',
+    db.Column('auto_prisao_id', db.Integer, db.ForeignKey('autos_prisao.id'), primary_key=True),
+    db.Column('crime_id', db.Integer, db.ForeignKey('crimes.id'), primary_key=True),
+    db.Index('ix_autos_crimes_crime', 'crime_id', 'auto_prisao_id')
+)
+
 class Crime(db.Model):
     __tablename__ = 'crimes'
 
@@ -8,5 +24,10 @@ class Crime(db.Model):
     artigo = db.Column(db.String(50)) # Ex: Art. 157 CP
     pena = db.Column(db.String(100)) # Ex: Reclusão de 4 a 10 anos
 
+    @property
+    def rotulo(self):
+        # Mesmo texto gravado no prefixo "[Natureza: ...]" das descrições
+        return f"{self.nome} ({self.artigo})"
+
     def __repr__(self):
-        return f'<Crime {self.nome}>'
\ No newline at end of file
+        return f'<Crime {self.nome}>'
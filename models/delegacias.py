@@ -0,0 +1,15 @@
+from db import db
+from datetime import datetime
+
+class Delegacia(db.Model):
+    __tablename__ = 'delegacias'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)  # Ex: '1ª DP', 'DGP - Geral'
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relacionamento
+    usuarios = db.relationship('Usuario', backref='delegacia_obj', lazy=True)
+
+    def __repr__(self):
+        return f'<Delegacia {self.nome}>'
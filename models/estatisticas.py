@@ -0,0 +1,26 @@
+from db import db
+from datetime import datetime
+
+class EstatisticaAgregada(db.Model):
+    __tablename__ = 'estatisticas_agregadas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    metrica = db.Column(db.String(50), nullable=False)   # Ex: 'boletins_status', 'prisoes_policial'
+    periodo = db.Column(db.String(10), nullable=False)   # Dia no formato 'AAAA-MM-DD'
+    dimensao = db.Column(db.String(120), nullable=False) # Ex: status, crime_id, tipo de movimentação
+    valor = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('metrica', 'periodo', 'dimensao', name='uq_estatistica_chave'),
+    )
+
+    def __repr__(self):
+        return f'<Estatistica {self.metrica} {self.periodo} {self.dimensao}={self.valor}>'
+
+class MarcaEstatistica(db.Model):
+    # Último id já agregado de cada tabela de origem (high-water mark)
+    __tablename__ = 'estatisticas_marcas'
+
+    fonte = db.Column(db.String(50), primary_key=True)
+    ultimo_id = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,27 @@
+from db import db
+from datetime import datetime
+
+class ChecksumArquivo(db.Model):
+    """Manifesto de integridade dos arquivos em static/evidencias e static/fotos_perfil.
+
+    sha256 é o hash gravado no upload (ou na primeira verificação); tamanho e
+    mtime_ns são os da última verificação e permitem pular arquivos intactos.
+    """
+    __tablename__ = 'checksums_arquivos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pasta = db.Column(db.String(20), nullable=False)   # 'evidencias' ou 'fotos_perfil'
+    arquivo = db.Column(db.String(200), nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    tamanho = db.Column(db.Integer)
+    mtime_ns = db.Column(db.Integer)
+    divergente = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    registrado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    verificado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('pasta', 'arquivo', name='uq_checksums_arquivos_pasta_arquivo'),
+    )
+
+    def __repr__(self):
+        return f'<ChecksumArquivo {self.pasta}/{self.arquivo}>'
@@ -5,7 +5,7 @@ class Pessoa(db.Model):
     __tablename__ = 'pessoas'
 
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(150), nullable=False)
+    nome = db.Column(db.String(150), nullable=False, index=True)
     rg = db.Column(db.String(20), unique=True) # Mudado de CPF para RG
     data_nascimento = db.Column(db.String(10)) # Novo
     nome_mae = db.Column(db.String(150))       # Novo
@@ -13,5 +13,22 @@ class Pessoa(db.Model):
     antecedentes = db.Column(db.Text) # Pode ser texto ou vinculado aos crimes depois
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Chaves fonéticas (servicos/similaridade.py), mantidas a cada inclusão/alteração
+    chave_fonetica = db.Column(db.String(150), index=True)
+    chave_fonetica_mae = db.Column(db.String(150), index=True)
+
+    __table_args__ = (
+        # Filtro por prefixo da API (nome LIKE 'prefixo%'); o LIKE do SQLite ignora caixa
+        db.Index('ix_pessoas_nome_nocase', nome.collate('NOCASE')),
+    )
+
     def __repr__(self):
-        return f'<Pessoa {self.nome}>'
\ No newline at end of file
+        return f'<Pessoa {self.nome}>'
+
+class PessoaTrigrama(db.Model):
+    """Índice invertido de trigramas do nome ('n'); o campo fica para outros nomes indexados."""
+    __tablename__ = 'pessoas_trigramas'
+
+    trigrama = db.Column(db.String(3), primary_key=True)
+    campo = db.Column(db.String(1), primary_key=True)
+    pessoa_id = db.Column(db.Integer, db.ForeignKey('pessoas.id'), primary_key=True, index=True)
@@ -24,7 +24,9 @@ class Usuario(db.Model):
     
     cargo_id = db.Column(db.Integer, db.ForeignKey('cargos.id'), nullable=True)
     
-    delegacia = db.Column(db.String(100))
+    # Lotação (delegacias.id); o texto livre antigo fica na coluna 'delegacia'
+    delegacia_id = db.Column(db.Integer, db.ForeignKey('delegacias.id'), nullable=True)
+    delegacia_legado = db.Column('delegacia', db.String(100))
     departamento = db.Column(db.String(100))
     endereco = db.Column(db.String(200))
     foto_perfil = db.Column(db.String(120), nullable=True, default='default.jpg')
@@ -32,6 +34,10 @@ class Usuario(db.Model):
     
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Sobe com edições, promoções, advertências e casos atribuídos
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
     # Relacionamentos
     promocoes = db.relationship('Promocao', backref='servidor', lazy=True)
     
@@ -56,10 +62,22 @@ class Usuario(db.Model):
     def cargo_nome(self):
         return self.cargo_obj.nome if self.cargo_obj else "Sem Cargo"
 
+    @property
+    def delegacia(self):
+        return self.delegacia_obj.nome if self.delegacia_obj else self.delegacia_legado
+
     @property
     def nivel_hierarquico(self):
         return self.cargo_obj.nivel if self.cargo_obj else 0
 
+    __table_args__ = (
+        # Efetivo de cada delegacia, em ordem alfabética
+        db.Index('ix_usuarios_delegacia_nome', 'delegacia_id', 'nome'),
+        # Busca do diretório (nome LIKE 'prefixo%'); o LIKE do SQLite ignora caixa
+        db.Index('ix_usuarios_nome_nocase', nome.collate('NOCASE')),
+        db.Index('ix_usuarios_cargo', 'cargo_id'),
+    )
+
     def __repr__(self):
         return f'<Usuario {self.nome}>'
 
@@ -88,6 +106,12 @@ class LogAtividade(db.Model):
     acao = db.Column(db.String(50))
     alvo = db.Column(db.String(100))
     detalhes = db.Column(db.Text)
-    data = db.Column(db.DateTime, default=datetime.utcnow)
+    data = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
-    autor = db.relationship('Usuario')
\ No newline at end of file
+    autor = db.relationship('Usuario')
+
+    # Tabela "quente": só os meses recentes (ver servicos/auditoria.py)
+    __table_args__ = (
+        db.Index('ix_logs_atividade_autor_data', 'autor_id', 'data'),
+        db.Index('ix_logs_atividade_acao_data', 'acao', 'data'),
+    )
\ No newline at end of file
@@ -0,0 +1,20 @@
+# Arquivo: reindexar_busca.py
+# Reconstrói o índice de busca textual (FTS5) de boletins e autos de prisão,
+# inclusive os que estão no arquivo morto.
+# Necessário uma vez para registros anteriores ao índice; depois ele é mantido
+# a cada cadastro/edição.
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.busca import disponivel, reconstruir_indice
+
+def executar():
+    with app.app_context():
+        atualizar_esquema()
+        if not disponivel():
+            print("Busca textual requer banco SQLite com FTS5.")
+            return
+        totais = reconstruir_indice()
+        print(f"Índice reconstruído: {totais['boletim']} boletins, {totais['auto']} autos de prisão.")
+
+if __name__ == "__main__":
+    executar()
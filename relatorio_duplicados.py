@@ -0,0 +1,26 @@
+# Arquivo: relatorio_duplicados.py
+# Relatório de possíveis cadastros duplicados em pessoas (grafias diferentes
+# de nome/nome da mãe). Registros anteriores ao índice são indexados antes.
+# Uso: python relatorio_duplicados.py [--reindexar]
+import sys
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.similaridade import reindexar_pessoas, agrupar_duplicados
+
+def executar(todos=False):
+    with app.app_context():
+        atualizar_esquema()
+        indexados = reindexar_pessoas(todos=todos)
+        if indexados:
+            print(f"Índice de similaridade atualizado: {indexados} registros.")
+
+        grupos = agrupar_duplicados()
+        for numero, grupo in enumerate(grupos, 1):
+            print(f"\nGrupo {numero} ({len(grupo)} registros):")
+            for pessoa in grupo:
+                print(f"  #{pessoa.id:<6} {pessoa.nome:<40} RG {pessoa.rg or '-':<15} "
+                      f"Mãe: {pessoa.nome_mae or '-'}")
+        print(f"\n{len(grupos)} grupos de possíveis duplicidades.")
+
+if __name__ == "__main__":
+    executar(todos='--reindexar' in sys.argv)
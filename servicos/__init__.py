@@ -0,0 +1 @@
+# Rotinas de apoio usadas pelas rotas e pelos scripts de manutenção.
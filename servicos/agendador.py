@@ -0,0 +1,57 @@
+import threading
+import time
+
+# Agendador mínimo em processo: uma thread daemon executa cada tarefa no seu
+# intervalo, dentro de um app_context (sessão própria, descartada ao final).
+# Com vários workers cada um tem o seu; as tarefas precisam tolerar isso
+# (ver o "claim" em servicos/custodia.py).
+
+_tarefas = []  # [nome, intervalo em segundos, função, próxima execução]
+_trava = threading.Lock()
+_parar = threading.Event()
+_thread = None
+
+def agendar(nome, intervalo, funcao):
+    with _trava:
+        if not any(t[0] == nome for t in _tarefas):
+            _tarefas.append([nome, intervalo, funcao, 0])
+
+def _laco(app):
+    while not _parar.is_set():
+        agora = time.monotonic()
+        with _trava:
+            vencidas = [t for t in _tarefas if t[3] <= agora]
+            for tarefa in vencidas:
+                tarefa[3] = agora + tarefa[1]
+            espera = min((t[3] for t in _tarefas), default=agora + 60) - agora
+        for nome, _, funcao, _ in vencidas:
+            with app.app_context():
+                try:
+                    funcao()
+                except Exception:
+                    app.logger.exception('Tarefa agendada %s falhou', nome)
+        _parar.wait(max(espera, 1))
+
+def iniciar(app):
+    global _thread
+    with _trava:
+        if _thread is not None:
+            return
+        _parar.clear()
+        _thread = threading.Thread(target=_laco, args=(app,), name='agendador', daemon=True)
+    _thread.start()
+
+def parar():
+    global _thread
+    _parar.set()
+    with _trava:
+        thread, _thread = _thread, None
+    if thread is not None:
+        thread.join(timeout=5)
+
+def registrar_agendador(app):
+    # Só sobe em processo que atende requisições (scripts de manutenção não)
+    @app.before_request
+    def iniciar_agendador():
+        if _thread is None and app.config.get('AGENDADOR_ATIVO'):
+            iniciar(app)
@@ -0,0 +1,158 @@
+from flask import request
+from sqlalchemy.orm import selectinload
+from db import db
+from models.pessoas import Pessoa
+from models.boletins import Boletim
+from models.auto_prisao import AutoPrisao
+from models.armas import Arma
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+MAXIMO_IDS = 100
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+def _data(valor):
+    return valor.isoformat() if valor else None
+
+def _crimes(registro):
+    return [{'id': c.id, 'nome': c.nome, 'artigo': c.artigo} for c in registro.crimes]
+
+# --- CAMPOS POR RECURSO ---
+# Cada campo é calculado só se for pedido em ?campos=, e os relacionamentos
+# listados em "cargas" só são carregados (selectinload) quando o campo é pedido.
+
+RECURSOS = {
+    'pessoas': {
+        'modelo': Pessoa,
+        'campos': {
+            'id': lambda p: p.id,
+            'nome': lambda p: p.nome,
+            'rg': lambda p: p.rg,
+            'data_nascimento': lambda p: p.data_nascimento,
+            'nome_mae': lambda p: p.nome_mae,
+            'endereco': lambda p: p.endereco,
+            'antecedentes': lambda p: p.antecedentes,
+            'criado_em': lambda p: _data(p.criado_em),
+        },
+        'cargas': set(),
+    },
+    'boletins': {
+        'modelo': Boletim,
+        'campos': {
+            'id': lambda b: b.id,
+            'numero': lambda b: b.numero_formatado,
+            'data': lambda b: _data(b.data),
+            'status': lambda b: b.status,
+            'autor': lambda b: b.autor,
+            'vitima': lambda b: b.vitima,
+            'descricao': lambda b: b.descricao,
+            'policial_id': lambda b: b.policial_responsavel_id,
+            'policial': lambda b: b.nome_policial,
+            'crimes': _crimes,
+            'anexos': lambda b: [{'id': a.id, 'arquivo': a.arquivo, 'tipo': a.tipo} for a in b.anexos],
+            'itens_apreendidos': lambda b: [i.id for i in b.itens_apreendidos],
+            'versao': lambda b: b.versao,
+        },
+        'cargas': {'policial', 'crimes', 'anexos', 'itens_apreendidos'},
+    },
+    'autos': {
+        'modelo': AutoPrisao,
+        'campos': {
+            'id': lambda a: a.id,
+            'horario': lambda a: _data(a.horario),
+            'preso': lambda a: a.preso,
+            'descricao_fato': lambda a: a.descricao_fato,
+            'testemunhas': lambda a: a.testemunhas,
+            'policial_id': lambda a: a.policial_responsavel_id,
+            'policial': lambda a: a.nome_policial,
+            'crimes': _crimes,
+            'itens_apreendidos': lambda a: [i.id for i in a.itens_apreendidos],
+            'versao': lambda a: a.versao,
+        },
+        'cargas': {'policial', 'crimes', 'itens_apreendidos'},
+    },
+    'armas': {
+        'modelo': Arma,
+        'campos': {
+            'id': lambda a: a.id,
+            'acervo': lambda a: a.acervo,
+            'tipo': lambda a: a.tipo,
+            'modelo': lambda a: a.modelo,
+            'marca': lambda a: a.marca,
+            'calibre': lambda a: a.calibre,
+            'numero_serie': lambda a: a.numero_serie,
+            'status': lambda a: a.status,
+            'localizacao_atual': lambda a: a.localizacao_atual,
+            'boletim_id': lambda a: a.boletim_id,
+            'auto_prisao_id': lambda a: a.auto_prisao_id,
+            'versao': lambda a: a.versao,
+        },
+        'cargas': set(),
+    },
+}
+
+# --- LEITURA ---
+
+def _campos_pedidos(recurso):
+    disponiveis = recurso['campos']
+    pedido = request.args.get('campos')
+    if not pedido:
+        return list(disponiveis)
+    campos = [c.strip() for c in pedido.split(',') if c.strip()]
+    invalidos = [c for c in campos if c not in disponiveis]
+    if invalidos:
+        raise ErroApi(f"Campos inválidos: {', '.join(invalidos)}")
+    return campos
+
+def _preparar(recurso, query, campos):
+    modelo = recurso['modelo']
+    cargas = [selectinload(getattr(modelo, campo)) for campo in recurso['cargas'] if campo in campos]
+    return query.options(*cargas) if cargas else query
+
+def _serializar(recurso, registro, campos):
+    return {campo: recurso['campos'][campo](registro) for campo in campos}
+
+def listar(nome, query):
+    """Lista com paginação por cursor (id decrescente) ou lote por ?ids=1,2,3."""
+    recurso = RECURSOS[nome]
+    modelo = recurso['modelo']
+    campos = _campos_pedidos(recurso)
+    query = _preparar(recurso, query, campos)
+
+    if request.args.get('ids'):
+        try:
+            ids = [int(i) for i in request.args['ids'].split(',') if i.strip()]
+        except ValueError:
+            raise ErroApi('Parâmetro ids deve conter números separados por vírgula.')
+        if len(ids) > MAXIMO_IDS:
+            raise ErroApi(f'Máximo de {MAXIMO_IDS} ids por requisição.')
+        registros = {r.id: r for r in query.filter(modelo.id.in_(ids))}
+        return {
+            'dados': [_serializar(recurso, registros[i], campos) for i in ids if i in registros],
+            'nao_encontrados': [i for i in ids if i not in registros],
+        }
+
+    limite = request.args.get('limite', LIMITE_PADRAO, type=int)
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    cursor = request.args.get('cursor', type=int)
+    if cursor:
+        query = query.filter(modelo.id < cursor)
+    registros = query.order_by(modelo.id.desc()).limit(limite + 1).all()
+    proximo = registros[limite - 1].id if len(registros) > limite else None
+    return {
+        'dados': [_serializar(recurso, r, campos) for r in registros[:limite]],
+        'proximo_cursor': proximo,
+    }
+
+def detalhar(nome, id):
+    recurso = RECURSOS[nome]
+    campos = _campos_pedidos(recurso)
+    registro = _preparar(recurso, recurso['modelo'].query, campos).filter_by(id=id).first()
+    if not registro:
+        raise ErroApi('Registro não encontrado.', 404)
+    return {'dados': _serializar(recurso, registro, campos)}
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, insert, literal, select, text, update
+from db import db
+from models.boletins import Boletim, AnexoBoletim
+from models.auto_prisao import AutoPrisao
+from models.users import Usuario
+from models.crimes import boletins_crimes, autos_crimes
+from models.arquivo import (BoletimArquivado, AnexoBoletimArquivado, AutoPrisaoArquivado,
+                            boletins_crimes_arquivo, autos_crimes_arquivo)
+
+TAMANHO_LOTE = 200
+
+# (tabela quente, tabela do arquivo, coluna que liga ao registro principal, mantém o id)
+# Anexos ganham id novo a cada mudança de tabela: só a URL de exclusão usa esse id,
+# e mantê-lo poderia colidir com ids reaproveitados pelo SQLite.
+MOVIMENTOS_BOLETIM = [
+    (Boletim.__table__, BoletimArquivado.__table__, 'id', True),
+    (AnexoBoletim.__table__, AnexoBoletimArquivado.__table__, 'boletim_id', False),
+    (boletins_crimes, boletins_crimes_arquivo, 'boletim_id', True),
+]
+MOVIMENTOS_AUTO = [
+    (AutoPrisao.__table__, AutoPrisaoArquivado.__table__, 'id', True),
+    (autos_crimes, autos_crimes_arquivo, 'auto_prisao_id', True),
+]
+
+def _copiar(conexao, origem, destino, coluna, ids, mantem_id, extras=None):
+    """INSERT ... SELECT das colunas em comum."""
+    extras = extras or {}
+    nomes = [c.name for c in destino.columns
+             if c.name in origem.c and (mantem_id or c.name != 'id')] + list(extras)
+    colunas = [origem.c[n] for n in nomes if n in origem.c] + \
+              [literal(valor).label(nome) for nome, valor in extras.items()]
+    conexao.execute(insert(destino).from_select(nomes, select(*colunas).where(origem.c[coluna].in_(ids))))
+
+def _mover(movimentos, ids, para_arquivo):
+    conexao = db.session.connection()
+    agora = datetime.utcnow()
+    # A movimentação é feita em SQL direto, sem passar pelo versionamento do ORM:
+    # o perfil do oficial lista esses casos, então a versão dele sobe aqui
+    principal = movimentos[0][0] if para_arquivo else movimentos[0][1]
+    conexao.execute(update(Usuario.__table__)
+                    .where(Usuario.id.in_(select(principal.c.policial_responsavel_id)
+                                          .where(principal.c.id.in_(ids))))
+                    .values(versao=Usuario.versao + 1, atualizado_em=agora))
+    # Pai primeiro ao copiar, filhos primeiro ao apagar
+    for quente, fria, coluna, mantem_id in movimentos:
+        origem, destino = (quente, fria) if para_arquivo else (fria, quente)
+        extras = {'arquivado_em': agora} if para_arquivo and 'arquivado_em' in destino.c else None
+        _copiar(conexao, origem, destino, coluna, ids, mantem_id, extras)
+    for quente, fria, coluna, _ in reversed(movimentos):
+        origem = quente if para_arquivo else fria
+        conexao.execute(delete(origem).where(origem.c[coluna].in_(ids)))
+
+def _arquivar(modelo, movimentos, criterio):
+    # O maior id nunca sai da tabela quente: o SQLite reutilizaria o id
+    # (max(rowid) + 1) no próximo cadastro e ele colidiria com o arquivo.
+    maior_id = db.session.query(db.func.max(modelo.id)).scalar() or 0
+    total = 0
+    while True:
+        ids = [i for i, in db.session.query(modelo.id)
+               .filter(criterio, modelo.id < maior_id)
+               .order_by(modelo.id).limit(TAMANHO_LOTE)]
+        if not ids:
+            break
+        _mover(movimentos, ids, para_arquivo=True)
+        db.session.commit()
+        total += len(ids)
+    return total
+
+def arquivar_casos(dias_boletins=None, dias_autos=None):
+    """Move B.O.s concluídos há mais de N dias e autos de prisão antigos para o arquivo.
+
+    Retorna (boletins, autos) movidos. Cada lote é uma transação: um erro no
+    meio não deixa registro duplicado nem perdido.
+    """
+    dias_boletins = dias_boletins or current_app.config['ARQUIVO_DIAS_BOLETINS']
+    dias_autos = dias_autos or current_app.config['ARQUIVO_DIAS_AUTOS']
+    agora = datetime.utcnow()
+
+    # atualizado_em acompanha a versão, então marca quando o caso foi concluído
+    concluido_em = db.func.coalesce(Boletim.atualizado_em, Boletim.data)
+    boletins = _arquivar(Boletim, MOVIMENTOS_BOLETIM,
+                         db.and_(Boletim.status == 'Concluído',
+                                 concluido_em < agora - timedelta(days=dias_boletins)))
+    autos = _arquivar(AutoPrisao, MOVIMENTOS_AUTO, AutoPrisao.horario < agora - timedelta(days=dias_autos))
+
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text('PRAGMA optimize'))
+    return boletins, autos
+
+def restaurar_boletim(id):
+    """Traz um B.O. (com anexos e tipificação) de volta à tabela quente. Não faz commit."""
+    arquivado = db.session.get(BoletimArquivado, id)
+    if not arquivado:
+        return None
+    db.session.expunge(arquivado)
+    _mover(MOVIMENTOS_BOLETIM, [id], para_arquivo=False)
+    return db.session.get(Boletim, id)
+
+def obter_boletim(id):
+    """B.O. ativo ou, se já arquivado, a cópia do arquivo (somente leitura)."""
+    return db.session.get(Boletim, id) or db.session.get(BoletimArquivado, id)
@@ -0,0 +1,165 @@
+import gzip
+import json
+import os
+import shutil
+import zlib
+from datetime import datetime
+from flask import current_app
+from db import db
+from models.users import LogAtividade, Usuario
+from models.auditoria import ArquivoAuditoria
+
+TAMANHO_LOTE = 1000
+
+def _inicio_mes(data, meses_atras=0):
+    ano, mes = data.year, data.month - meses_atras
+    while mes < 1:
+        ano, mes = ano - 1, mes + 12
+    return datetime(ano, mes, 1)
+
+def _proximo_mes(inicio):
+    return datetime(inicio.year + (inicio.month == 12), inicio.month % 12 + 1, 1)
+
+def _caminho(nome_arquivo):
+    return os.path.join(current_app.config['AUDITORIA_DIR'], nome_arquivo)
+
+def _serializar(log, nomes):
+    return json.dumps({
+        'id': log.id,
+        'autor_id': log.autor_id,
+        'autor': nomes.get(log.autor_id),
+        'acao': log.acao,
+        'alvo': log.alvo,
+        'detalhes': log.detalhes,
+        'data': log.data.isoformat() if log.data else None,
+    }, ensure_ascii=False)
+
+# --- COMPACTAÇÃO ---
+
+def _gravar_mes(caminho, ini, fim, nomes, maior_id):
+    """Monta o arquivo do mês num .tmp (conteúdo atual + um membro gzip por lote) e troca uma vez.
+
+    Retorna os ids gravados; só depois da troca eles podem sair da tabela.
+    """
+    temporario = caminho + '.tmp'
+    ids, ultimo_id = [], 0
+    with open(temporario, 'wb') as destino:
+        if os.path.exists(caminho):
+            with open(caminho, 'rb') as origem:
+                shutil.copyfileobj(origem, destino)
+        while True:
+            lote = LogAtividade.query.filter(LogAtividade.data >= ini, LogAtividade.data < fim,
+                                             LogAtividade.id > ultimo_id, LogAtividade.id < maior_id) \
+                .order_by(LogAtividade.id).limit(TAMANHO_LOTE).all()
+            if not lote:
+                break
+            destino.write(gzip.compress(''.join(_serializar(log, nomes) + '\n' for log in lote).encode('utf-8')))
+            ids += [log.id for log in lote]
+            ultimo_id = lote[-1].id
+        destino.flush()
+        os.fsync(destino.fileno())
+    if ids:
+        os.replace(temporario, caminho)
+    else:
+        os.remove(temporario)
+    return ids
+
+def compactar_auditoria(meses_quentes=None):
+    """Move os meses antigos de logs_atividade para arquivos gzip JSONL.
+
+    O arquivo do mês é reescrito uma única vez por execução (cópia temporária +
+    rename) e só então as linhas são apagadas da tabela: uma interrupção no
+    meio só pode duplicar linhas no arquivo (a leitura descarta ids
+    repetidos), nunca perdê-las nem deixar um membro gzip truncado.
+    """
+    if meses_quentes is None:
+        meses_quentes = current_app.config['AUDITORIA_MESES_QUENTES']
+    limite = _inicio_mes(datetime.utcnow(), meses_quentes)
+    os.makedirs(current_app.config['AUDITORIA_DIR'], exist_ok=True)
+    nomes = dict(db.session.query(Usuario.id, Usuario.nome).all())
+    # O maior id fica na tabela: sem ele o SQLite reutilizaria ids já arquivados
+    # e a leitura, que descarta ids repetidos, esconderia os registros novos
+    maior_id = db.session.query(db.func.max(LogAtividade.id)).scalar() or 0
+    resumo = {}
+
+    while True:
+        mais_antigo = db.session.query(db.func.min(LogAtividade.data)) \
+            .filter(LogAtividade.data < limite, LogAtividade.id < maior_id).scalar()
+        if mais_antigo is None:
+            break
+        ini = _inicio_mes(mais_antigo)
+        fim = _proximo_mes(ini)
+        mes = ini.strftime('%Y-%m')
+
+        catalogo = ArquivoAuditoria.query.filter_by(mes=mes).first()
+        if not catalogo:
+            catalogo = ArquivoAuditoria(mes=mes, arquivo=f'logs_{mes}.jsonl.gz', total_registros=0)
+            db.session.add(catalogo)
+
+        ids = _gravar_mes(_caminho(catalogo.arquivo), ini, fim, nomes, maior_id)
+        for i in range(0, len(ids), TAMANHO_LOTE):
+            LogAtividade.query.filter(LogAtividade.id.in_(ids[i:i + TAMANHO_LOTE])) \
+                .delete(synchronize_session=False)
+        catalogo.total_registros += len(ids)
+        catalogo.atualizado_em = datetime.utcnow()
+        db.session.commit()
+
+        # Linhas com data nula não entram em nenhum mês; evita laço infinito
+        if not ids:
+            break
+        resumo[mes] = len(ids)
+    return resumo
+
+# --- LEITURA (VISUALIZADOR) ---
+
+def consultar_logs(autor_id=None, acao=None, de=None, ate=None):
+    query = LogAtividade.query.options(db.joinedload(LogAtividade.autor))
+    if autor_id:
+        query = query.filter(LogAtividade.autor_id == autor_id)
+    if acao:
+        query = query.filter(LogAtividade.acao == acao)
+    if de:
+        query = query.filter(LogAtividade.data >= de)
+    if ate:
+        query = query.filter(LogAtividade.data < ate)
+    return query.order_by(LogAtividade.data.desc(), LogAtividade.id.desc())
+
+def ler_arquivo(mes, autor_id=None, acao=None, pagina=1, por_pagina=50):
+    """Lê uma página de um mês arquivado, em ordem cronológica, com os filtros do visualizador.
+
+    Os membros gzip são lidos em sequência e a leitura para assim que a página
+    (mais um registro, para saber se há próxima) estiver completa. Retorna
+    (itens, total, ha_mais); total só é conhecido sem filtros (vem do catálogo).
+    """
+    catalogo = ArquivoAuditoria.query.filter_by(mes=mes).first()
+    if not catalogo or not os.path.exists(_caminho(catalogo.arquivo)):
+        return [], 0, False
+
+    pular = (pagina - 1) * por_pagina
+    vistos, itens, ha_mais = set(), [], False
+    try:
+        with gzip.open(_caminho(catalogo.arquivo), 'rt', encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                registro = json.loads(linha)
+                if registro['id'] in vistos:
+                    continue
+                vistos.add(registro['id'])
+                if autor_id and registro['autor_id'] != autor_id:
+                    continue
+                if acao and registro['acao'] != acao:
+                    continue
+                if pular:
+                    pular -= 1
+                    continue
+                if len(itens) == por_pagina:
+                    ha_mais = True
+                    break
+                registro['data'] = datetime.fromisoformat(registro['data']) if registro['data'] else None
+                itens.append(registro)
+    except (EOFError, gzip.BadGzipFile, zlib.error, UnicodeDecodeError, json.JSONDecodeError):
+        # Último membro truncado (arquivos de versões antigas): mostra o que foi lido
+        current_app.logger.warning('Arquivo de auditoria %s truncado; exibindo %d registros lidos',
+                                   catalogo.arquivo, len(vistos))
+
+    total = None if autor_id or acao else catalogo.total_registros
+    return itens, total, ha_mais
@@ -0,0 +1,217 @@
+import re
+from markupsafe import escape, Markup
+from sqlalchemy import DDL, event, text
+from db import db
+from models.boletins import Boletim
+from models.auto_prisao import AutoPrisao
+from models.arquivo import BoletimArquivado, AutoPrisaoArquivado
+from servicos.delegacias import TODAS, escopo_atual
+
+TABELA = 'busca_narrativas'
+POR_PAGINA = 20
+TAMANHO_LOTE = 500
+
+# Marcadores do snippet(); trocados por <mark> depois de escapar o texto
+INICIO_DESTAQUE, FIM_DESTAQUE = '\x02', '\x03'
+
+# rowid do índice: boletins nos pares, autos de prisão nos ímpares.
+# Assim cada registro é atualizado/removido direto pelo rowid.
+TIPOS = {
+    'boletim': (Boletim, 0, lambda b: (f'{b.autor or ""} {b.vitima or ""}', b.descricao)),
+    'auto': (AutoPrisao, 1, lambda a: (f'{a.preso or ""} {a.testemunhas or ""}', a.descricao_fato)),
+}
+# Casos arquivados continuam no índice (a movimentação não passa pelo ORM)
+ARQUIVO = {'boletim': BoletimArquivado, 'auto': AutoPrisaoArquivado}
+# Campos que, alterados, regravam a linha do índice
+CAMPOS = {
+    Boletim: ('autor', 'vitima', 'descricao', 'delegacia_id'),
+    AutoPrisao: ('preso', 'testemunhas', 'descricao_fato', 'delegacia_id'),
+}
+
+# delegacia_id vai junto de cada linha: a busca de quem só vê a própria
+# delegacia filtra já no índice (contagem e página), como as demais consultas
+SQL_CRIAR_INDICE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+    "tipo UNINDEXED, delegacia_id UNINDEXED, envolvidos, narrativa, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+CRIAR_INDICE = DDL(SQL_CRIAR_INDICE).execute_if(dialect='sqlite')
+
+def _tipo_do_modelo(modelo):
+    return next(tipo for tipo, (m, _, _) in TIPOS.items() if m is modelo)
+
+def _rowid(tipo, registro_id):
+    return registro_id * 2 + TIPOS[tipo][1]
+
+def disponivel():
+    return db.engine.dialect.name == 'sqlite'
+
+def _gravar(conexao, tipo, registro):
+    envolvidos, narrativa = TIPOS[tipo][2](registro)
+    conexao.execute(text(f"INSERT OR REPLACE INTO {TABELA} (rowid, tipo, delegacia_id, envolvidos, narrativa) "
+                         "VALUES (:rowid, :tipo, :delegacia_id, :envolvidos, :narrativa)"),
+                    {'rowid': _rowid(tipo, registro.id), 'tipo': tipo, 'delegacia_id': registro.delegacia_id,
+                     'envolvidos': envolvidos, 'narrativa': narrativa or ''})
+
+def _remover(conexao, tipo, registro_id):
+    conexao.execute(text(f"DELETE FROM {TABELA} WHERE rowid = :rowid"),
+                    {'rowid': _rowid(tipo, registro_id)})
+
+# --- Sincronização (eventos do ORM) ---
+
+def _apos_inclusao(mapper, conexao, registro):
+    if conexao.dialect.name == 'sqlite':
+        _gravar(conexao, _tipo_do_modelo(mapper.class_), registro)
+
+def _apos_alteracao(mapper, conexao, registro):
+    if conexao.dialect.name != 'sqlite':
+        return
+    estado = db.inspect(registro)
+    if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS[mapper.class_]):
+        _gravar(conexao, _tipo_do_modelo(mapper.class_), registro)
+
+def _apos_exclusao(mapper, conexao, registro):
+    if conexao.dialect.name == 'sqlite':
+        _remover(conexao, _tipo_do_modelo(mapper.class_), registro.id)
+
+def _delegacia_da_linha(indice):
+    # Lotação do registro de uma linha do índice, na tabela quente ou no arquivo morto
+    casos = []
+    for tipo, (modelo, _, _) in TIPOS.items():
+        tabelas = (modelo.__tablename__, ARQUIVO[tipo].__tablename__)
+        buscas = ', '.join(f"(SELECT delegacia_id FROM {t} WHERE id = {indice}.rowid / 2)" for t in tabelas)
+        casos.append(f"WHEN '{tipo}' THEN coalesce({buscas})")
+    return f"CASE {indice}.tipo {' '.join(casos)} END"
+
+def _migrar_indice(metadata, conexao, **kw):
+    # Índice criado antes da coluna delegacia_id: FTS5 não tem ALTER TABLE ADD
+    # COLUMN, então a tabela é recriada copiando as linhas (sem reindexar textos)
+    if conexao.dialect.name != 'sqlite':
+        return
+    colunas = {linha[1] for linha in conexao.exec_driver_sql(f"PRAGMA table_info({TABELA})")}
+    if not colunas or 'delegacia_id' in colunas:
+        return
+    conexao.exec_driver_sql(f"ALTER TABLE {TABELA} RENAME TO {TABELA}_antigo")
+    conexao.exec_driver_sql(SQL_CRIAR_INDICE)
+    conexao.exec_driver_sql(
+        f"INSERT INTO {TABELA} (rowid, tipo, delegacia_id, envolvidos, narrativa) "
+        f"SELECT rowid, tipo, {_delegacia_da_linha(f'{TABELA}_antigo')}, envolvidos, narrativa "
+        f"FROM {TABELA}_antigo")
+    conexao.exec_driver_sql(f"DROP TABLE {TABELA}_antigo")
+
+def atualizar_delegacias():
+    """Copia para o índice a lotação de registros vinculados fora do ORM (vincular_delegacias)."""
+    if not disponivel():
+        return 0
+    resultado = db.session.execute(text(
+        f"UPDATE {TABELA} SET delegacia_id = {_delegacia_da_linha(TABELA)} WHERE delegacia_id IS NULL"))
+    db.session.commit()
+    return resultado.rowcount
+
+def registrar_indice_busca():
+    for funcao in (_migrar_indice, CRIAR_INDICE):
+        if not event.contains(db.metadata, 'after_create', funcao):
+            event.listen(db.metadata, 'after_create', funcao)
+    for modelo in CAMPOS:
+        for nome, funcao in (('after_insert', _apos_inclusao), ('after_update', _apos_alteracao),
+                             ('after_delete', _apos_exclusao)):
+            if not event.contains(modelo, nome, funcao):
+                event.listen(modelo, nome, funcao)
+
+def reconstruir_indice(tamanho_lote=TAMANHO_LOTE):
+    """Apaga e reindexa todos os boletins e autos (ativos e arquivados) em lotes. Retorna {tipo: total}."""
+    db.session.execute(text(f"DELETE FROM {TABELA}"))
+    db.session.commit()
+    totais = {}
+    for tipo, (modelo_ativo, _, _) in TIPOS.items():
+        totais[tipo] = 0
+        # O id é mantido no arquivo morto, então o rowid é o mesmo nas duas tabelas
+        for modelo in (modelo_ativo, ARQUIVO[tipo]):
+            ultimo_id = 0
+            while True:
+                lote = modelo.query.filter(modelo.id > ultimo_id).order_by(modelo.id).limit(tamanho_lote).all()
+                if not lote:
+                    break
+                conexao = db.session.connection()
+                for registro in lote:
+                    _gravar(conexao, tipo, registro)
+                totais[tipo] += len(lote)
+                ultimo_id = lote[-1].id
+                db.session.commit()
+                db.session.expunge_all()
+    db.session.execute(text(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('optimize')"))
+    db.session.commit()
+    return totais
+
+# --- Consulta ---
+
+def montar_consulta(termos):
+    """Converte a busca digitada em sintaxe FTS5 segura.
+
+    "frase exata" vira frase, palavra* vira prefixo e o resto são termos
+    obrigatórios (AND). Aspas e operadores soltos do usuário são neutralizados.
+    """
+    partes = []
+    for frase, palavra in re.findall(r'"([^"]+)"|(\S+)', termos or ''):
+        if frase:
+            palavras = re.findall(r'\w+', frase)
+            if palavras:
+                partes.append('"' + ' '.join(palavras) + '"')
+            continue
+        prefixo = palavra.endswith('*')
+        for token in re.findall(r'\w+', palavra):
+            partes.append(f'"{token}"')
+        if prefixo and partes and re.search(r'\w', palavra):
+            partes[-1] += '*'
+    return ' '.join(partes)
+
+def _destacar(trecho):
+    trecho = str(escape(trecho or ''))
+    return Markup(trecho.replace(INICIO_DESTAQUE, '<mark>').replace(FIM_DESTAQUE, '</mark>'))
+
+def buscar(termos, tipo=None, pagina=1, por_pagina=POR_PAGINA):
+    """Resultados ordenados por relevância (bm25), com trechos destacados.
+
+    Restritos à delegacia em foco, como as demais consultas da requisição.
+    """
+    consulta = montar_consulta(termos)
+    if not consulta:
+        return {'itens': [], 'total': 0, 'pagina': 1, 'paginas': 0}
+
+    filtros = 'AND tipo = :tipo ' if tipo in TIPOS else ''
+    delegacia = escopo_atual()
+    if delegacia != TODAS:
+        # IS também casa NULL (usuário ainda sem lotação)
+        filtros += 'AND delegacia_id IS :delegacia '
+    params = {'consulta': consulta, 'tipo': tipo, 'delegacia': delegacia}
+    total = db.session.execute(text(
+        f"SELECT count(*) FROM {TABELA} WHERE {TABELA} MATCH :consulta {filtros}"), params).scalar()
+
+    paginas = max(1, -(-total // por_pagina))
+    pagina = min(max(1, pagina), paginas)
+    linhas = db.session.execute(text(
+        f"SELECT rowid, tipo, "
+        f"snippet({TABELA}, 2, :ini, :fim, '…', 12), "
+        f"snippet({TABELA}, 3, :ini, :fim, '…', 24) "
+        f"FROM {TABELA} WHERE {TABELA} MATCH :consulta {filtros}"
+        f"ORDER BY rank LIMIT :limite OFFSET :deslocamento"),
+        dict(params, ini=INICIO_DESTAQUE, fim=FIM_DESTAQUE,
+             limite=por_pagina, deslocamento=(pagina - 1) * por_pagina)).all()
+
+    # Carrega os registros da página em uma consulta por tipo (e no arquivo, os que faltarem)
+    registros = {}
+    for t in TIPOS:
+        ids = {rowid // 2 for rowid, tp, _, _ in linhas if tp == t}
+        for modelo in (TIPOS[t][0], ARQUIVO[t]):
+            if ids:
+                encontrados = {r.id: r for r in modelo.query.filter(modelo.id.in_(ids))}
+                registros.setdefault(t, {}).update(encontrados)
+                ids -= set(encontrados)
+
+    itens = []
+    for rowid, tp, envolvidos, narrativa in linhas:
+        registro = registros.get(tp, {}).get(rowid // 2)
+        if registro is not None:
+            itens.append({'tipo': tp, 'registro': registro,
+                          'envolvidos': _destacar(envolvidos), 'narrativa': _destacar(narrativa)})
+    return {'itens': itens, 'total': total, 'pagina': pagina, 'paginas': paginas}
@@ -0,0 +1,95 @@
+import zlib
+from flask import request
+
+try:  # brotli é opcional (pip install brotli); sem ele só gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressão das respostas dinâmicas (HTML das páginas e JSON da API).
+# Downloads de evidências, fotos, dossiês (zip) e o stream SSE passam direto:
+# ou já são comprimidos, ou a compressão seguraria o stream no buffer.
+
+TIPOS_COMPRIMIVEIS = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+    'application/json', 'application/javascript', 'image/svg+xml',
+}
+ROTAS_IGNORADAS = {'static', 'baixar_evidencia', 'dossie_boletim', 'eventos_dashboard'}
+TAMANHO_MINIMO = 500  # Abaixo disso os cabeçalhos gzip custam mais que a economia
+NIVEL_GZIP = 6
+QUALIDADE_BROTLI = 4  # Rápido o bastante para conteúdo gerado a cada requisição
+
+def _codificacao_aceita():
+    # A de maior q que o cliente aceita; no empate, brotli (comprime mais)
+    suportadas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    aceitas = request.accept_encodings
+    melhor = max(suportadas, key=aceitas.quality)
+    return melhor if aceitas.quality(melhor) > 0 else None
+
+def _novo_compressor(codificacao, nivel_gzip=NIVEL_GZIP, qualidade_brotli=QUALIDADE_BROTLI):
+    """Objeto com compress(bytes) e flush(); o flush do stream manda o que já foi gerado."""
+    if codificacao == 'br':
+        return brotli.Compressor(quality=qualidade_brotli)
+    return zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)  # 31 = cabeçalho gzip
+
+def comprimir(dados, codificacao, **opcoes):
+    compressor = _novo_compressor(codificacao, **opcoes)
+    if codificacao == 'br':
+        return compressor.process(dados) + compressor.finish()
+    return compressor.compress(dados) + compressor.flush()
+
+def _comprimir_fluxo(partes, codificacao):
+    compressor = _novo_compressor(codificacao)
+    try:
+        for parte in partes:
+            if isinstance(parte, str):
+                parte = parte.encode()
+            if codificacao == 'br':
+                saida = compressor.process(parte) + compressor.flush()
+            else:
+                saida = compressor.compress(parte) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if saida:
+                yield saida
+        yield compressor.finish() if codificacao == 'br' else compressor.flush()
+    finally:
+        if hasattr(partes, 'close'):
+            partes.close()
+
+def _adicionar_vary(resposta):
+    vary = {v.lower() for v in resposta.vary}
+    if 'accept-encoding' not in vary:
+        resposta.vary.add('Accept-Encoding')
+
+def comprimir_resposta(resposta):
+    if (request.method == 'HEAD' or request.endpoint in ROTAS_IGNORADAS
+            or resposta.direct_passthrough or resposta.status_code < 200
+            or resposta.status_code in (204, 206, 304)
+            or resposta.mimetype not in TIPOS_COMPRIMIVEIS
+            or 'Content-Encoding' in resposta.headers
+            or 'no-transform' in resposta.headers.get('Cache-Control', '')):
+        return resposta
+
+    # A representação depende do Accept-Encoding, mesmo quando sai sem compressão
+    _adicionar_vary(resposta)
+    codificacao = _codificacao_aceita()
+    if codificacao is None:
+        return resposta
+
+    if resposta.is_streamed:
+        resposta.response = _comprimir_fluxo(resposta.response, codificacao)
+        resposta.headers.pop('Content-Length', None)
+    else:
+        dados = resposta.get_data()
+        if len(dados) < TAMANHO_MINIMO:
+            return resposta
+        resposta.set_data(comprimir(dados, codificacao))  # Atualiza o Content-Length
+
+    resposta.headers['Content-Encoding'] = codificacao
+    # Bytes diferentes: um ETag forte não pode ser o mesmo da versão sem compressão
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(f'{etag}-{codificacao}')
+    return resposta
+
+def registrar_compressao(app):
+    app.after_request(comprimir_resposta)
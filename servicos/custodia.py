@@ -0,0 +1,90 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from flask import current_app
+from sqlalchemy import update
+from db import db
+from models.armas import Arma
+from models.avisos import Aviso
+from servicos import agendador, eventos
+
+# Cautelas vencidas: o prazo da Retirada é copiado para Arma.cautela_ate, então
+# achar o que está atrasado é um range no índice parcial ix_armas_cautela_aberta,
+# sem ler o histórico de movimentações.
+
+def _fuso():
+    return ZoneInfo(current_app.config['FUSO_HORARIO'])
+
+def local_para_utc(valor):
+    """Data/hora digitada (sem fuso, no horário local) -> UTC sem fuso, como o resto do banco."""
+    return valor.replace(tzinfo=_fuso()).astimezone(timezone.utc).replace(tzinfo=None)
+
+def hora_local(valor, formato='%d/%m %H:%M'):
+    """Filtro de template: prazo gravado em UTC exibido no horário local."""
+    if valor is None:
+        return ''
+    return valor.replace(tzinfo=timezone.utc).astimezone(_fuso()).strftime(formato)
+
+def _vencidas(agora):
+    return Arma.query.filter(Arma.cautela_ate.isnot(None), Arma.cautela_ate < agora)
+
+def cautelas_vencidas(agora=None):
+    """Itens com prazo de devolução estourado, mais atrasados primeiro.
+
+    Numa requisição vem já filtrado pela delegacia do usuário.
+    """
+    return _vencidas(agora or datetime.utcnow()).order_by(Arma.cautela_ate).all()
+
+def abrir_cautela(arma, devolver_ate):
+    arma.cautela_ate = devolver_ate
+    arma.cautela_avisada = False
+
+def fechar_cautela(arma):
+    arma.cautela_ate = None
+    arma.cautela_avisada = False
+
+def avisar_cautelas_vencidas():
+    """Publica no mural de cada delegacia um aviso com os itens dela que venceram.
+
+    Cada item é "reservado" com UPDATE ... WHERE cautela_avisada = 0: com mais
+    de um worker rodando o agendador, só um deles avisa cada item.
+    """
+    candidatos = [a.id for a in _vencidas(datetime.utcnow()).filter(Arma.cautela_avisada.is_(False))]
+    if not candidatos:
+        return 0
+    reservados = db.session.execute(
+        update(Arma).where(Arma.id.in_(candidatos), Arma.cautela_avisada.is_(False))
+                    .values(cautela_avisada=True).returning(Arma.id)
+                    .execution_options(synchronize_session=False)).scalars().all()
+    if not reservados:
+        db.session.commit()
+        return 0
+
+    por_delegacia = defaultdict(list)
+    for arma in Arma.query.filter(Arma.id.in_(reservados)).order_by(Arma.cautela_ate):
+        por_delegacia[arma.delegacia_id].append(arma)
+    avisos = []
+    for delegacia_id, itens in por_delegacia.items():
+        linhas = [f"#{a.id} {a.tipo} {a.modelo} ({a.numero_serie or 's/ série'}) com {a.localizacao_atual} "
+                  f"desde {hora_local(a.cautela_ate)}" for a in itens]
+        aviso = Aviso(titulo=f'Cautela vencida: {len(itens)} item(ns) não devolvido(s)',
+                      conteudo='\n'.join(linhas), prioridade='Alta', delegacia_id=delegacia_id)
+        db.session.add(aviso)
+        avisos.append(aviso)
+    db.session.commit()
+    # Só o painel da própria delegacia (e quem vê todas) recebe o aviso
+    for aviso in avisos:
+        eventos.publicar('aviso', {
+            'id': aviso.id,
+            'titulo': aviso.titulo,
+            'conteudo': aviso.conteudo,
+            'prioridade': aviso.prioridade,
+            'data': aviso.data_criacao.strftime('%d/%m %H:%M'),
+            'autor': 'Sistema'
+        }, aviso.delegacia_id)
+    return len(reservados)
+
+def registrar_custodia(app):
+    app.add_template_filter(hora_local, 'hora_local')
+    agendador.agendar('cautelas_vencidas', app.config['CAUTELA_VERIFICAR_MINUTOS'] * 60,
+                      avisar_cautelas_vencidas)
@@ -0,0 +1,164 @@
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, session
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session, with_loader_criteria
+from db import db
+from models.delegacias import Delegacia
+from models.users import Usuario, Cargo
+from models.boletins import Boletim
+from models.auto_prisao import AutoPrisao
+from models.armas import Arma
+from models.arquivo import BoletimArquivado, AutoPrisaoArquivado
+
+# Particionamento por delegacia: toda consulta ORM feita durante uma requisição
+# recebe "delegacia_id = <lotação do usuário>" para os modelos abaixo (os
+# índices compostos começam por delegacia_id). Do nível NIVEL_TODAS_DELEGACIAS
+# para cima não há filtro, a não ser que o usuário escolha uma delegacia.
+# Carregamento de relacionamentos não é filtrado: um B.O. da casa continua
+# mostrando o oficial que foi transferido.
+
+MODELOS = (Usuario, Boletim, AutoPrisao, Arma, BoletimArquivado, AutoPrisaoArquivado)
+TODAS = 'todas'
+# Escopo de quem não existe mais (sessão ou token de usuário excluído): nenhuma linha
+NENHUMA = -1
+
+# (tabela, coluna que aponta para a origem, tabela de origem) para a migração
+HERANCAS = [
+    (Boletim.__table__, 'policial_responsavel_id', Usuario.__table__),
+    (BoletimArquivado.__table__, 'policial_responsavel_id', Usuario.__table__),
+    (AutoPrisao.__table__, 'policial_responsavel_id', Usuario.__table__),
+    (AutoPrisaoArquivado.__table__, 'policial_responsavel_id', Usuario.__table__),
+    (Arma.__table__, 'boletim_id', Boletim.__table__),
+    (Arma.__table__, 'boletim_id', BoletimArquivado.__table__),
+    (Arma.__table__, 'auto_prisao_id', AutoPrisao.__table__),
+    (Arma.__table__, 'auto_prisao_id', AutoPrisaoArquivado.__table__),
+]
+
+def escopo_atual():
+    """TODAS, o id da delegacia visível, None (usuário ainda sem lotação) ou NENHUMA."""
+    return g.get('escopo_delegacia', TODAS) if has_app_context() else TODAS
+
+def ve_todas():
+    return g.get('ve_todas_delegacias', False)
+
+@contextmanager
+def sem_escopo():
+    """Consultas que precisam do estado inteiro (estatísticas, marcas de versão)."""
+    anterior = escopo_atual()
+    g.escopo_delegacia = TODAS
+    try:
+        yield
+    finally:
+        g.escopo_delegacia = anterior
+
+def definir_escopo(usuario_id, selecionada=None):
+    """Escopo da requisição a partir da lotação do usuário. False se ele não existe."""
+    linha = db.session.query(Usuario.delegacia_id, Cargo.nivel) \
+        .outerjoin(Cargo, Cargo.id == Usuario.cargo_id) \
+        .filter(Usuario.id == usuario_id).execution_options(todas_delegacias=True).first()
+    if not linha:
+        g.delegacia_usuario, g.ve_todas_delegacias, g.escopo_delegacia = None, False, NENHUMA
+        return False
+    g.delegacia_usuario = linha.delegacia_id
+    g.ve_todas_delegacias = (linha.nivel or 0) >= current_app.config['NIVEL_TODAS_DELEGACIAS']
+    if g.ve_todas_delegacias:
+        g.escopo_delegacia = selecionada or TODAS
+    else:
+        g.escopo_delegacia = linha.delegacia_id
+    return True
+
+def delegacia_para_registro():
+    """Lotação gravada em registros novos: a delegacia em foco ou a do usuário."""
+    escopo = escopo_atual()
+    return escopo if escopo not in (TODAS, None, NENHUMA) else g.get('delegacia_usuario')
+
+def canal_eventos():
+    # Painel de quem vê todas as delegacias recebe os contadores de todas
+    escopo = escopo_atual()
+    return None if escopo == TODAS else escopo
+
+# --- Eventos ---
+
+def _aplicar_escopo(estado):
+    if not estado.is_select or estado.is_relationship_load or estado.is_column_load:
+        return
+    escopo = escopo_atual()
+    if escopo == TODAS or estado.execution_options.get('todas_delegacias'):
+        return
+    for modelo in MODELOS:
+        if escopo is None:
+            criterio = with_loader_criteria(modelo, lambda cls: cls.delegacia_id.is_(None), include_aliases=True)
+        else:
+            criterio = with_loader_criteria(modelo, lambda cls: cls.delegacia_id == escopo, include_aliases=True)
+        estado.statement = estado.statement.options(criterio)
+
+def _antes_inclusao(mapper, conexao, registro):
+    if registro.delegacia_id is None and has_app_context():
+        registro.delegacia_id = delegacia_para_registro()
+
+def registrar_delegacias(app):
+    if not event.contains(Session, 'do_orm_execute', _aplicar_escopo):
+        event.listen(Session, 'do_orm_execute', _aplicar_escopo)
+    for modelo in (Usuario, Boletim, AutoPrisao, Arma):
+        if not event.contains(modelo, 'before_insert', _antes_inclusao):
+            event.listen(modelo, 'before_insert', _antes_inclusao)
+
+    @app.before_request
+    def escopo_da_requisicao():
+        if 'user_id' in session:
+            definir_escopo(session['user_id'], session.get('delegacia_ativa'))
+
+# --- Migração do texto livre ---
+
+def obter_delegacia(nome):
+    nome = (nome or '').strip()
+    delegacia = Delegacia.query.filter_by(nome=nome).first()
+    if not delegacia:
+        delegacia = Delegacia(nome=nome)
+        db.session.add(delegacia)
+        db.session.flush()
+    return delegacia
+
+def _sem_delegacia(tabela):
+    return db.session.execute(select(db.func.count()).select_from(tabela)
+                              .where(tabela.c.delegacia_id.is_(None))).scalar()
+
+def vincular_delegacias():
+    """Preenche delegacia_id de usuários, casos e armaria a partir do texto antigo.
+
+    Usuário: delegacia digitada no cadastro. B.O./auto: lotação do oficial
+    responsável. Item da armaria: B.O. ou auto vinculado. O que sobrar vai
+    para DELEGACIA_PADRAO. Só mexe em linhas ainda sem delegacia. Retorna
+    {tabela: linhas vinculadas}.
+    """
+    usuarios = Usuario.__table__
+    totais = {}
+    for nome, in db.session.query(db.func.trim(Usuario.delegacia_legado)) \
+            .filter(Usuario.delegacia_id.is_(None)).distinct():
+        if nome:
+            obter_delegacia(nome)
+    digitada = db.func.trim(usuarios.c.delegacia)
+    resultado = db.session.execute(
+        update(usuarios).where(usuarios.c.delegacia_id.is_(None), digitada.in_(select(Delegacia.nome)))
+                        .values(delegacia_id=select(Delegacia.id).where(Delegacia.nome == digitada)
+                                                                 .scalar_subquery()))
+    totais['usuarios'] = resultado.rowcount
+
+    for tabela, coluna, origem in HERANCAS:
+        com_delegacia = select(origem.c.id).where(origem.c.delegacia_id.isnot(None))
+        da_origem = select(origem.c.delegacia_id).where(origem.c.id == tabela.c[coluna]).scalar_subquery()
+        resultado = db.session.execute(
+            update(tabela).where(tabela.c.delegacia_id.is_(None), tabela.c[coluna].in_(com_delegacia))
+                          .values(delegacia_id=da_origem))
+        totais[tabela.name] = totais.get(tabela.name, 0) + resultado.rowcount
+
+    # Sem delegacia digitada, sem oficial ou sem caso vinculado
+    padrao = None
+    for tabela in [usuarios] + [t for t, _, _ in HERANCAS]:
+        if _sem_delegacia(tabela):
+            padrao = padrao or obter_delegacia(current_app.config['DELEGACIA_PADRAO'])
+            resultado = db.session.execute(update(tabela).where(tabela.c.delegacia_id.is_(None))
+                                                         .values(delegacia_id=padrao.id))
+            totais[tabela.name] = totais.get(tabela.name, 0) + resultado.rowcount
+    db.session.commit()
+    return totais
@@ -0,0 +1,118 @@
+import glob
+import hashlib
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app, render_template
+from db import db
+from models.armas import MovimentacaoArma
+from servicos.arquivamento import obter_boletim
+
+# Um único worker basta: a montagem é limitada por disco e evita disputar o SQLite
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dossie')
+_em_andamento = set()
+_trava = threading.Lock()
+
+# Formatos já comprimidos vão "stored" para não gastar CPU à toa
+JA_COMPRIMIDOS = ('.jpg', '.jpeg', '.png', '.gif', '.pdf', '.docx', '.zip')
+
+def _pasta_evidencias(app):
+    return os.path.join(app.root_path, app.config['EVIDENCE_FOLDER'])
+
+def _arquivos_do_boletim(boletim):
+    arquivos = [a.arquivo for a in boletim.anexos]
+    if boletim.arquivo_evidencia:
+        arquivos.insert(0, boletim.arquivo_evidencia)
+    return arquivos
+
+def assinatura_dossie(boletim):
+    """Hash do conteúdo que entra no dossiê; muda quando o B.O., um anexo ou a custódia muda."""
+    h = hashlib.sha1()
+    for valor in (boletim.id, boletim.status, boletim.autor, boletim.vitima, boletim.descricao,
+                  boletim.policial_responsavel_id, boletim.nome_policial,
+                  sorted(c.id for c in boletim.crimes)):
+        h.update(repr(valor).encode())
+    pasta = _pasta_evidencias(current_app)
+    for nome in _arquivos_do_boletim(boletim):
+        try:
+            st = os.stat(os.path.join(pasta, nome))
+            h.update(f'{nome}:{st.st_size}:{st.st_mtime_ns}'.encode())
+        except OSError:
+            h.update(f'{nome}:ausente'.encode())
+    ids_itens = [item.id for item in boletim.itens_apreendidos]
+    for item in boletim.itens_apreendidos:
+        h.update(repr((item.id, item.status, item.localizacao_atual)).encode())
+    if ids_itens:
+        ultimo = db.session.query(db.func.max(MovimentacaoArma.id), db.func.count(MovimentacaoArma.id)) \
+            .filter(MovimentacaoArma.arma_id.in_(ids_itens)).one()
+        h.update(repr(tuple(ultimo)).encode())
+    return h.hexdigest()[:16]
+
+def caminho_dossie(boletim_id, assinatura):
+    return os.path.join(current_app.config['DOSSIE_DIR'], f'bo_{boletim_id}_{assinatura}.zip')
+
+def solicitar_dossie(boletim):
+    """Retorna o caminho do zip se já estiver em cache; senão agenda a montagem e retorna None."""
+    assinatura = assinatura_dossie(boletim)
+    caminho = caminho_dossie(boletim.id, assinatura)
+    if os.path.exists(caminho):
+        return caminho
+    chave = (boletim.id, assinatura)
+    with _trava:
+        if chave not in _em_andamento:
+            _em_andamento.add(chave)
+            _executor.submit(_montar, current_app._get_current_object(), boletim.id, assinatura)
+    return None
+
+def _montar(app, boletim_id, assinatura):
+    try:
+        with app.app_context():
+            boletim = obter_boletim(boletim_id)
+            if boletim:
+                _gravar_zip(app, boletim, assinatura)
+    except Exception:
+        app.logger.exception('Falha ao montar dossiê do B.O. %s', boletim_id)
+    finally:
+        with _trava:
+            _em_andamento.discard((boletim_id, assinatura))
+
+def _gravar_zip(app, boletim, assinatura):
+    custodia = {
+        item.id: MovimentacaoArma.query.filter_by(arma_id=item.id)
+                                       .order_by(MovimentacaoArma.data_movimentacao).all()
+        for item in boletim.itens_apreendidos
+    }
+    arquivos = _arquivos_do_boletim(boletim)
+    relatorio = render_template('dossie_boletim.html', boletim=boletim, custodia=custodia,
+                                arquivos=arquivos, gerado_em=datetime.utcnow())
+
+    os.makedirs(app.config['DOSSIE_DIR'], exist_ok=True)
+    destino = os.path.join(app.config['DOSSIE_DIR'], f'bo_{boletim.id}_{assinatura}.zip')
+    temporario = destino + '.tmp'
+    pasta = _pasta_evidencias(app)
+
+    with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('relatorio.html', relatorio)
+        for nome in arquivos:
+            origem = os.path.join(pasta, nome)
+            if not os.path.exists(origem):
+                continue
+            tipo = zipfile.ZIP_STORED if nome.lower().endswith(JA_COMPRIMIDOS) else zipfile.ZIP_DEFLATED
+            info = zipfile.ZipInfo.from_file(origem, arcname=f'anexos/{nome}')
+            info.compress_type = tipo
+            # Copia em blocos: anexos grandes não são carregados inteiros na memória
+            with open(origem, 'rb') as entrada, zf.open(info, 'w') as saida:
+                shutil.copyfileobj(entrada, saida, 1024 * 1024)
+
+    os.replace(temporario, destino)
+
+    # Versões antigas do mesmo B.O. deixam de ser válidas
+    for antigo in glob.glob(os.path.join(app.config['DOSSIE_DIR'], f'bo_{boletim.id}_*.zip')):
+        if antigo != destino:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
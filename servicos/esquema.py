@@ -0,0 +1,33 @@
+from sqlalchemy import inspect, text
+from db import db
+
+
+def atualizar_esquema():
+    """Cria tabelas novas e aplica colunas/índices adicionados aos modelos.
+
+    O projeto não usa Alembic: ``db.create_all()`` só cria tabelas que ainda
+    não existem, então colunas e índices declarados depois da criação do
+    banco são aplicados aqui com ALTER TABLE / CREATE INDEX.
+    """
+    db.create_all()
+    engine = db.engine
+    inspetor = inspect(engine)
+
+    with engine.begin() as conn:
+        for tabela in db.metadata.sorted_tables:
+            if not inspetor.has_table(tabela.name):
+                continue
+            existentes = {c['name'] for c in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                ddl = f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {coluna.type.compile(dialect=engine.dialect)}'
+                for fk in coluna.foreign_keys:
+                    ddl += f' REFERENCES {fk.column.table.name} ({fk.column.name})'
+                if coluna.server_default is not None:
+                    ddl += f' DEFAULT {coluna.server_default.arg}'
+                conn.execute(text(ddl))
+
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=engine, checkfirst=True)
@@ -0,0 +1,189 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from db import db
+from models.estatisticas import EstatisticaAgregada, MarcaEstatistica
+from models.boletins import Boletim
+from models.auto_prisao import AutoPrisao
+from models.armas import MovimentacaoArma
+from models.users import Usuario, Cargo, Advertencia
+from models.crimes import Crime, boletins_crimes
+from models.arquivo import BoletimArquivado, AutoPrisaoArquivado, boletins_crimes_arquivo
+
+TAMANHO_LOTE = 500
+
+# --- AGREGAÇÕES POR FONTE ---
+# Cada função recebe a faixa de ids (ini, fim] ainda não agregada e devolve
+# pares (metrica, linhas) com linhas no formato (dia, dimensao, quantidade).
+
+def _agregar_boletins(ini, fim):
+    metricas = []
+    # Casos já arquivados continuam contando (relevante no recálculo completo)
+    for modelo, vinculos in ((Boletim, boletins_crimes), (BoletimArquivado, boletins_crimes_arquivo)):
+        dia = db.func.date(modelo.data)
+        faixa = (modelo.id > ini, modelo.id <= fim)
+        por_status = db.session.query(dia, modelo.status, db.func.count()) \
+            .filter(*faixa).group_by(dia, modelo.status)
+        por_crime = db.session.query(dia, vinculos.c.crime_id, db.func.count()) \
+            .join(vinculos, vinculos.c.boletim_id == modelo.id) \
+            .filter(*faixa).group_by(dia, vinculos.c.crime_id)
+        metricas += [('boletins_status', por_status), ('boletins_crime', por_crime)]
+    return metricas
+
+def _agregar_autos(ini, fim):
+    metricas = []
+    for modelo in (AutoPrisao, AutoPrisaoArquivado):
+        dia = db.func.date(modelo.horario)
+        por_policial = db.session.query(dia, modelo.policial_responsavel_id, db.func.count()) \
+            .filter(modelo.id > ini, modelo.id <= fim).group_by(dia, modelo.policial_responsavel_id)
+        metricas.append(('prisoes_policial', por_policial))
+    return metricas
+
+def _agregar_movimentacoes(ini, fim):
+    dia = db.func.date(MovimentacaoArma.data_movimentacao)
+    por_tipo = db.session.query(dia, MovimentacaoArma.tipo_movimentacao, db.func.count()) \
+        .filter(MovimentacaoArma.id > ini, MovimentacaoArma.id <= fim) \
+        .group_by(dia, MovimentacaoArma.tipo_movimentacao)
+    return [('armaria_movimentacoes', por_tipo)]
+
+def _agregar_advertencias(ini, fim):
+    dia = db.func.date(Advertencia.data_aplicacao)
+    por_cargo = db.session.query(dia, Cargo.nome, db.func.count()) \
+        .join(Usuario, Usuario.id == Advertencia.usuario_id) \
+        .outerjoin(Cargo, Cargo.id == Usuario.cargo_id) \
+        .filter(Advertencia.id > ini, Advertencia.id <= fim).group_by(dia, Cargo.nome)
+    return [('advertencias_cargo', por_cargo)]
+
+FONTES = [
+    ('boletins', Boletim, _agregar_boletins),
+    ('autos_prisao', AutoPrisao, _agregar_autos),
+    ('movimentacoes_armas', MovimentacaoArma, _agregar_movimentacoes),
+    ('advertencias', Advertencia, _agregar_advertencias),
+]
+
+# --- ATUALIZAÇÃO INCREMENTAL ---
+
+def _aplicar(metrica, linhas):
+    deltas = Counter()
+    for dia, dimensao, quantidade in linhas:
+        if dia is None:
+            continue
+        deltas[(str(dia), str(dimensao) if dimensao is not None else 'Não informado')] += quantidade
+    if not deltas:
+        return
+
+    dias = sorted({dia for dia, _ in deltas})
+    existentes = {}
+    for i in range(0, len(dias), TAMANHO_LOTE):
+        for e in EstatisticaAgregada.query.filter(EstatisticaAgregada.metrica == metrica,
+                                                  EstatisticaAgregada.periodo.in_(dias[i:i + TAMANHO_LOTE])):
+            existentes[(e.periodo, e.dimensao)] = e
+
+    for (dia, dimensao), quantidade in deltas.items():
+        if (dia, dimensao) in existentes:
+            existentes[(dia, dimensao)].valor += quantidade
+        else:
+            db.session.add(EstatisticaAgregada(metrica=metrica, periodo=dia, dimensao=dimensao, valor=quantidade))
+
+def atualizar_estatisticas():
+    """Agrega apenas as linhas com id acima da marca de cada fonte."""
+    for fonte, modelo, agregar in FONTES:
+        marca = db.session.get(MarcaEstatistica, fonte)
+        ini = marca.ultimo_id if marca else 0
+        fim = db.session.query(db.func.max(modelo.id)).scalar() or 0
+        if fim <= ini:
+            continue
+
+        for metrica, linhas in agregar(ini, fim):
+            _aplicar(metrica, linhas)
+
+        try:
+            if marca:
+                # Avança a marca só se ninguém avançou antes (evita contagem dupla)
+                avancou = MarcaEstatistica.query.filter_by(fonte=fonte, ultimo_id=ini) \
+                    .update({'ultimo_id': fim, 'atualizado_em': datetime.utcnow()})
+                if not avancou:
+                    db.session.rollback()
+                    continue
+            else:
+                db.session.add(MarcaEstatistica(fonte=fonte, ultimo_id=fim))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+def recalcular_estatisticas():
+    EstatisticaAgregada.query.delete()
+    MarcaEstatistica.query.delete()
+    db.session.commit()
+    atualizar_estatisticas()
+
+def ajustar_status_boletim(boletim, status_anterior):
+    """Move a contagem de um B.O. já agregado para o novo status (mesma transação da rota)."""
+    if status_anterior == boletim.status:
+        return
+    marca = db.session.get(MarcaEstatistica, 'boletins')
+    if not marca or boletim.id > marca.ultimo_id:
+        return  # Ainda não agregado: entrará com o status atual
+    dia = boletim.data.strftime('%Y-%m-%d')
+    _aplicar('boletins_status', [(dia, status_anterior, -1), (dia, boletim.status, 1)])
+
+def ajustar_crimes_boletim(boletim, crimes_anteriores):
+    """Idem para os vínculos com crimes: tira os removidos e soma os novos em boletins_crime."""
+    anteriores = {c.id for c in crimes_anteriores}
+    atuais = {c.id for c in boletim.crimes}
+    if anteriores == atuais:
+        return
+    marca = db.session.get(MarcaEstatistica, 'boletins')
+    if not marca or boletim.id > marca.ultimo_id:
+        return
+    dia = boletim.data.strftime('%Y-%m-%d')
+    _aplicar('boletins_crime', [(dia, cid, -1) for cid in anteriores - atuais] +
+                               [(dia, cid, 1) for cid in atuais - anteriores])
+
+# --- LEITURA PARA O PAINEL ---
+
+def painel_estatisticas(meses=12):
+    hoje = datetime.utcnow().date()
+    inicio = (hoje.replace(day=1) - timedelta(days=31 * (meses - 1))).replace(day=1)
+    linhas = EstatisticaAgregada.query.filter(EstatisticaAgregada.periodo >= inicio.isoformat()).all()
+
+    mensal = defaultdict(Counter)        # 'AAAA-MM' -> {status: qtd}
+    semanal = Counter()                  # 'AAAA-Sss' -> qtd
+    crimes_mes = Counter()
+    prisoes = Counter()
+    movimentacoes = Counter()
+    advertencias = Counter()
+    mes_atual = hoje.strftime('%Y-%m')
+    inicio_semanas = hoje - timedelta(weeks=8)
+    inicio_30_dias = (hoje - timedelta(days=30)).isoformat()
+
+    for e in linhas:
+        if e.metrica == 'boletins_status':
+            mensal[e.periodo[:7]][e.dimensao] += e.valor
+            dia = datetime.strptime(e.periodo, '%Y-%m-%d').date()
+            if dia > inicio_semanas:
+                ano, semana, _ = dia.isocalendar()
+                semanal[f'{ano}-S{semana:02d}'] += e.valor
+        elif e.metrica == 'boletins_crime' and e.periodo.startswith(mes_atual):
+            crimes_mes[e.dimensao] += e.valor
+        elif e.metrica == 'prisoes_policial':
+            prisoes[e.dimensao] += e.valor
+        elif e.metrica == 'armaria_movimentacoes' and e.periodo >= inicio_30_dias:
+            movimentacoes[e.dimensao] += e.valor
+        elif e.metrica == 'advertencias_cargo':
+            advertencias[e.dimensao] += e.valor
+
+    ids_policiais = [int(i) for i in prisoes if i.isdigit()]
+    nomes_policiais = {str(u.id): u.nome for u in Usuario.query.filter(Usuario.id.in_(ids_policiais))} if ids_policiais else {}
+    nomes_crimes = {str(c.id): c.rotulo for c in Crime.query.filter(Crime.id.in_([int(i) for i in crimes_mes]))} if crimes_mes else {}
+
+    return {
+        'mensal': [(mes, mensal[mes], sum(mensal[mes].values())) for mes in sorted(mensal)],
+        'maior_mes': max((sum(c.values()) for c in mensal.values()), default=0),
+        'semanal': sorted(semanal.items()),
+        'crimes_mes': [(nomes_crimes.get(cid, f'Crime #{cid}'), qtd) for cid, qtd in crimes_mes.most_common()],
+        'prisoes_policial': [(nomes_policiais.get(uid, uid), qtd) for uid, qtd in prisoes.most_common()],
+        'movimentacoes': movimentacoes.most_common(),
+        'advertencias_cargo': advertencias.most_common(),
+        'marcas': MarcaEstatistica.query.all(),
+    }
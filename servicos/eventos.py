@@ -0,0 +1,39 @@
+import json
+import queue
+import threading
+
+# Pub/sub em memória para o painel (Server-Sent Events).
+# Cada conexão aberta tem sua própria fila; publicar() formata a mensagem uma
+# única vez e distribui para todas. Nenhum assinante segura conexão com o banco.
+# Canal = delegacia: evento com canal só vai para quem assina aquele canal ou
+# assina sem canal (quem vê todas as delegacias).
+
+TAMANHO_FILA = 100
+
+_assinantes = {}  # fila -> canal
+_trava = threading.Lock()
+
+def assinar(canal=None):
+    fila = queue.Queue(maxsize=TAMANHO_FILA)
+    with _trava:
+        _assinantes[fila] = canal
+    return fila
+
+def cancelar(fila):
+    with _trava:
+        _assinantes.pop(fila, None)
+
+def publicar(evento, dados, canal=None):
+    mensagem = f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+    with _trava:
+        filas = [fila for fila, c in _assinantes.items() if canal is None or c is None or c == canal]
+    for fila in filas:
+        try:
+            fila.put_nowait(mensagem)
+        except queue.Full:
+            # Cliente lento: descarta em vez de travar quem publica
+            pass
+
+def total_assinantes():
+    with _trava:
+        return len(_assinantes)
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update
+from db import db
+from servicos.unidade_trabalho import apos_commit
+from models.evidencias import ChecksumArquivo
+from models.boletins import Boletim, AnexoBoletim
+from models.arquivo import BoletimArquivado, AnexoBoletimArquivado
+from models.acadepol import Comunicado
+from models.users import Usuario
+
+# pasta lógica -> chave do app.config com o caminho
+PASTAS = {'evidencias': 'EVIDENCE_FOLDER', 'fotos_perfil': 'UPLOAD_FOLDER'}
+
+# Arquivos que existem sem estar referenciados em nenhuma tabela
+IGNORADOS = {'default.jpg', '.gitkeep'}
+
+TRABALHADORES = 8
+# Arquivo mais novo que isso pode ser um upload cuja transação ainda não terminou
+CARENCIA_ORFAOS = 3600
+
+def caminho_pasta(app, pasta):
+    return os.path.join(app.root_path, app.config[PASTAS[pasta]])
+
+def sha256_arquivo(caminho, bloco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()
+
+# --- Registro no upload / remoção ---
+
+def salvar_arquivo(arquivo, pasta, nome):
+    """Salva o upload e grava seu checksum no manifesto (na transação da requisição)."""
+    caminho = os.path.join(caminho_pasta(current_app, pasta), nome)
+    arquivo.save(caminho)
+    st = os.stat(caminho)
+    registro = ChecksumArquivo.query.filter_by(pasta=pasta, arquivo=nome).first() \
+        or ChecksumArquivo(pasta=pasta, arquivo=nome)
+    registro.sha256 = sha256_arquivo(caminho)
+    registro.tamanho, registro.mtime_ns = st.st_size, st.st_mtime_ns
+    registro.divergente = False
+    registro.registrado_em = registro.verificado_em = datetime.utcnow()
+    db.session.add(registro)
+    return nome
+
+def _apagar_do_disco(app, pasta, nome):
+    try:
+        os.remove(os.path.join(caminho_pasta(app, pasta), nome))
+    except FileNotFoundError:
+        pass
+    except OSError:
+        app.logger.exception('Não foi possível remover %s/%s', pasta, nome)
+
+def descartar_arquivo(pasta, nome):
+    """Tira o arquivo do manifesto e o apaga do disco depois do commit.
+
+    Se a requisição for desfeita o arquivo continua lá, junto com o registro
+    que aponta para ele.
+    """
+    if not nome or nome in IGNORADOS:
+        return
+    ChecksumArquivo.query.filter_by(pasta=pasta, arquivo=nome).delete(synchronize_session=False)
+    apos_commit(_apagar_do_disco, current_app._get_current_object(), pasta, nome)
+
+# --- Varredura ---
+
+def _listar_armazenamento(app):
+    arquivos = {}
+    for pasta in PASTAS:
+        diretorio = caminho_pasta(app, pasta)
+        if not os.path.isdir(diretorio):
+            continue
+        with os.scandir(diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name not in IGNORADOS:
+                    st = entrada.stat()
+                    arquivos[(pasta, entrada.name)] = (entrada.path, st.st_size, st.st_mtime_ns, st.st_mtime)
+    return arquivos
+
+def _listar_referencias(app):
+    with app.app_context():
+        consultas = [
+            ('evidencias', db.session.query(AnexoBoletim.arquivo)),
+            ('evidencias', db.session.query(AnexoBoletimArquivado.arquivo)),
+            ('evidencias', db.session.query(Boletim.arquivo_evidencia).filter(Boletim.arquivo_evidencia.isnot(None))),
+            ('evidencias', db.session.query(BoletimArquivado.arquivo_evidencia)
+                                     .filter(BoletimArquivado.arquivo_evidencia.isnot(None))),
+            ('evidencias', db.session.query(Comunicado.arquivo_anexo).filter(Comunicado.arquivo_anexo.isnot(None))),
+            ('fotos_perfil', db.session.query(Usuario.foto_perfil).filter(Usuario.foto_perfil.isnot(None))),
+        ]
+        # Referência em qualquer delegacia conta: sem isso o arquivo viraria órfão
+        return {(pasta, nome) for pasta, consulta in consultas
+                for nome, in consulta.execution_options(todas_delegacias=True)
+                if nome and nome not in IGNORADOS}
+
+def _carregar_manifesto(app):
+    with app.app_context():
+        return {(r.pasta, r.arquivo): (r.id, r.sha256, r.tamanho, r.mtime_ns, r.divergente)
+                for r in db.session.query(ChecksumArquivo.id, ChecksumArquivo.pasta, ChecksumArquivo.arquivo,
+                                          ChecksumArquivo.sha256, ChecksumArquivo.tamanho,
+                                          ChecksumArquivo.mtime_ns, ChecksumArquivo.divergente)}
+
+def verificar_integridade(completo=False, reclamar=False, trabalhadores=TRABALHADORES):
+    """Confere armazenamento x tabelas x manifesto de checksums.
+
+    Disco, referências e manifesto são lidos em paralelo; só arquivos novos ou
+    com tamanho/mtime diferentes do manifesto são re-hasheados (todos, se
+    completo=True). Com reclamar=True os órfãos mais antigos que
+    CARENCIA_ORFAOS são apagados. Retorna um dicionário com o relatório.
+    """
+    app = current_app._get_current_object()
+    agora = datetime.utcnow()
+
+    with ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='integridade') as pool:
+        armazenamento = pool.submit(_listar_armazenamento, app)
+        referencias = pool.submit(_listar_referencias, app)
+        manifesto = pool.submit(_carregar_manifesto, app)
+        armazenamento, referencias, manifesto = armazenamento.result(), referencias.result(), manifesto.result()
+
+        pendentes = [(chave, dados) for chave, dados in armazenamento.items()
+                     if completo or chave not in manifesto
+                     or manifesto[chave][2:4] != (dados[1], dados[2])]
+        hashes = dict(zip((chave for chave, _ in pendentes),
+                          pool.map(lambda item: sha256_arquivo(item[1][0]), pendentes)))
+
+    novos, atualizar = [], []
+    alterados = {chave for chave, dados in manifesto.items() if dados[4] and chave in armazenamento}
+    for chave, sha in hashes.items():
+        _, tamanho, mtime_ns, _ = armazenamento[chave]
+        if chave not in manifesto:
+            # Primeira vez que o arquivo é visto: o hash atual vira a referência
+            novos.append({'pasta': chave[0], 'arquivo': chave[1], 'sha256': sha, 'tamanho': tamanho,
+                          'mtime_ns': mtime_ns, 'registrado_em': agora, 'verificado_em': agora})
+            continue
+        # O sha256 do manifesto nunca é sobrescrito: a divergência fica marcada até alguém resolver
+        divergente = sha != manifesto[chave][1]
+        (alterados.add if divergente else alterados.discard)(chave)
+        atualizar.append({'id': manifesto[chave][0], 'tamanho': tamanho, 'mtime_ns': mtime_ns,
+                          'divergente': divergente, 'verificado_em': agora})
+
+    orfaos = sorted(set(armazenamento) - referencias)
+    pendentes_ref = sorted(referencias - set(armazenamento))
+    sumidos = [manifesto[chave][0] for chave in manifesto if chave not in armazenamento]
+
+    reclamados = []
+    if reclamar:
+        limite = time.time() - CARENCIA_ORFAOS
+        for chave in orfaos:
+            if armazenamento[chave][3] < limite:
+                _apagar_do_disco(app, *chave)
+                reclamados.append(chave)
+                if chave in manifesto:
+                    sumidos.append(manifesto[chave][0])
+        reclamados_set = set(reclamados)
+        novos = [n for n in novos if (n['pasta'], n['arquivo']) not in reclamados_set]
+
+    if novos:
+        db.session.execute(ChecksumArquivo.__table__.insert(), novos)
+    if atualizar:
+        db.session.execute(update(ChecksumArquivo), atualizar)
+    if sumidos:
+        ChecksumArquivo.query.filter(ChecksumArquivo.id.in_(sumidos)).delete(synchronize_session=False)
+    db.session.commit()
+
+    return {
+        'arquivos': len(armazenamento),
+        'verificados': len(hashes),
+        'novos': len(novos),
+        'alterados': sorted(alterados),
+        'orfaos': orfaos,
+        'referencias_quebradas': pendentes_ref,
+        'reclamados': reclamados,
+    }
@@ -0,0 +1,159 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from flask import Response, g, request, session
+from werkzeug.middleware.proxy_fix import ProxyFix
+from servicos import agendador
+
+# Limite de requisições por usuário (no login, por matrícula e por IP) nas rotas de escrita
+# e upload, com token bucket: cada chave tem até `capacidade` fichas, repostas a
+# `capacidade / janela` por segundo. Sem ficha a resposta é 429 com Retry-After,
+# antes de qualquer consulta ao banco principal.
+#
+# Os baldes ficam num SQLite separado (LIMITES_DB), compartilhado entre os
+# workers: assim um cliente insistente não pressiona o único escritor do banco
+# da aplicação. Se esse arquivo falhar, a requisição passa (fail open).
+# Atrás de proxy reverso, PROXIES_CONFIAVEIS faz o IP ser o do cliente (X-Forwarded-For).
+
+# endpoint: (capacidade, janela em segundos). Só POST conta; o GET do formulário não.
+ORCAMENTOS = {
+    'login': (5, 60),
+    'cadastrar_boletim': (10, 60),
+    'adicionar_anexo_boletim': (20, 60),
+    'movimentar_arma': (20, 60),
+}
+# Login: o balde acima é por matrícula + IP (colegas atrás do mesmo NAT não se
+# bloqueiam); este, mais folgado, é só por IP e segura quem varia a matrícula.
+ORCAMENTOS_IP = {
+    'login': (30, 60),
+}
+# ...e este, só pela matrícula, segura quem tenta a mesma senha de vários IPs
+ORCAMENTOS_MATRICULA = {
+    'login': (20, 600),
+}
+ROTAS_UPLOAD = {'adicionar_anexo_boletim'}
+VAGA_UPLOAD_SEGUNDOS = 300  # Vaga de upload de um worker que morreu expira sozinha
+BALDE_OCIOSO_SEGUNDOS = 3600
+
+_local = threading.local()
+
+def _conexao(caminho):
+    # Uma conexão por thread (e por processo: o fork não herda a do pai)
+    chave = (os.getpid(), caminho)
+    if getattr(_local, 'chave', None) != chave:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        con = sqlite3.connect(caminho, timeout=0.2, isolation_level=None)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('PRAGMA synchronous=OFF')  # Perder baldes num crash não importa
+        con.execute('CREATE TABLE IF NOT EXISTS baldes '
+                    '(chave TEXT PRIMARY KEY, fichas REAL NOT NULL, atualizado REAL NOT NULL)')
+        con.execute('CREATE TABLE IF NOT EXISTS vagas_upload '
+                    '(id INTEGER PRIMARY KEY, expira REAL NOT NULL)')
+        _local.chave, _local.con = chave, con
+    return _local.con
+
+def consumir(caminho, chave, capacidade, janela, agora=None):
+    """Tira uma ficha do balde. Retorna 0 se passou, ou os segundos até a próxima ficha."""
+    agora = agora or time.time()
+    taxa = capacidade / janela
+    con = _conexao(caminho)
+    con.execute('BEGIN IMMEDIATE')
+    try:
+        linha = con.execute('SELECT fichas, atualizado FROM baldes WHERE chave = ?', (chave,)).fetchone()
+        fichas = capacidade if linha is None else min(capacidade, linha[0] + (agora - linha[1]) * taxa)
+        espera = 0 if fichas >= 1 else (1 - fichas) / taxa
+        if not espera:
+            fichas -= 1
+        con.execute('INSERT INTO baldes (chave, fichas, atualizado) VALUES (?, ?, ?) '
+                    'ON CONFLICT(chave) DO UPDATE SET fichas = excluded.fichas, atualizado = excluded.atualizado',
+                    (chave, fichas, agora))
+        con.execute('COMMIT')
+    except BaseException:
+        con.execute('ROLLBACK')
+        raise
+    return espera
+
+def ocupar_vaga_upload(caminho, limite, agora=None):
+    """Reserva uma das `limite` vagas de upload simultâneo. Retorna o id da vaga ou None."""
+    agora = agora or time.time()
+    con = _conexao(caminho)
+    con.execute('BEGIN IMMEDIATE')
+    try:
+        con.execute('DELETE FROM vagas_upload WHERE expira < ?', (agora,))
+        ocupadas = con.execute('SELECT COUNT(*) FROM vagas_upload').fetchone()[0]
+        vaga = None
+        if ocupadas < limite:
+            vaga = con.execute('INSERT INTO vagas_upload (expira) VALUES (?)',
+                               (agora + VAGA_UPLOAD_SEGUNDOS,)).lastrowid
+        con.execute('COMMIT')
+    except BaseException:
+        con.execute('ROLLBACK')
+        raise
+    return vaga
+
+def liberar_vaga_upload(caminho, vaga):
+    _conexao(caminho).execute('DELETE FROM vagas_upload WHERE id = ?', (vaga,))
+
+def limpar_baldes(caminho, agora=None):
+    # Balde parado há uma hora já está cheio de novo: a linha não guarda nada útil
+    agora = agora or time.time()
+    return _conexao(caminho).execute('DELETE FROM baldes WHERE atualizado < ?',
+                                     (agora - BALDE_OCIOSO_SEGUNDOS,)).rowcount
+
+def _muitas_requisicoes(espera, mensagem):
+    resposta = Response(mensagem, 429, mimetype='text/plain')
+    resposta.headers['Retry-After'] = str(max(1, math.ceil(espera)))
+    return resposta
+
+def registrar_limites(app):
+    # Registrado antes dos demais before_request: a recusa não toca o banco principal
+    caminho = app.config['LIMITES_DB']
+    if app.config['PROXIES_CONFIAVEIS']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXIES_CONFIAVEIS'],
+                                x_proto=app.config['PROXIES_CONFIAVEIS'])
+    agendador.agendar('limpar_limites', 600, lambda: limpar_baldes(caminho))
+
+    @app.before_request
+    def aplicar_limites():
+        orcamento = ORCAMENTOS.get(request.endpoint)
+        if not app.config['LIMITES_ATIVOS'] or orcamento is None or request.method != 'POST':
+            return None
+        usuario_id = session.get('user_id')
+        if usuario_id:
+            chaves = [(f'{request.endpoint}:u{usuario_id}', orcamento)]
+        elif request.endpoint in ORCAMENTOS_IP:
+            # Só o formulário de login é lido aqui; uploads anônimos não têm o corpo processado
+            matricula = request.form.get('matricula', '').strip().lower()[:40]
+            chaves = [(f'{request.endpoint}:m{matricula}:ip{request.remote_addr}', orcamento),
+                      (f'{request.endpoint}:ip{request.remote_addr}', ORCAMENTOS_IP[request.endpoint])]
+            if matricula:
+                chaves.append((f'{request.endpoint}:m{matricula}', ORCAMENTOS_MATRICULA[request.endpoint]))
+        else:
+            chaves = [(f'{request.endpoint}:ip{request.remote_addr}', orcamento)]
+        try:
+            for chave, (capacidade, janela) in chaves:
+                espera = consumir(caminho, chave, capacidade, janela)
+                if espera:
+                    break
+            if espera:
+                app.logger.warning('Limite excedido: %s', chave)
+                return _muitas_requisicoes(espera, 'Muitas requisições. Aguarde alguns segundos e tente de novo.')
+            if request.endpoint in ROTAS_UPLOAD:
+                # Antes de ler o corpo: uploads recusados nem chegam a ocupar o worker
+                g._vaga_upload = ocupar_vaga_upload(caminho, app.config['UPLOADS_SIMULTANEOS'])
+                if g._vaga_upload is None:
+                    return _muitas_requisicoes(2, 'Muitos envios de arquivo em andamento. Tente de novo em instantes.')
+        except sqlite3.Error:
+            app.logger.exception('Falha no controle de limites; requisição liberada')
+        return None
+
+    @app.teardown_request
+    def devolver_vaga_upload(erro=None):
+        vaga = g.pop('_vaga_upload', None)
+        if vaga is not None:
+            try:
+                liberar_vaga_upload(caminho, vaga)
+            except sqlite3.Error:
+                app.logger.exception('Falha ao liberar vaga de upload %s', vaga)  # Expira sozinha
@@ -0,0 +1,211 @@
+import re
+import unicodedata
+from sqlalchemy import event, func, or_
+from db import db
+from models.pessoas import Pessoa, PessoaTrigrama
+
+PARTICULAS = {'DE', 'DA', 'DO', 'DAS', 'DOS', 'E', 'DI', 'DU'}
+
+# Fração mínima de trigramas em comum para um registro entrar como candidato
+MINIMO_TRIGRAMAS = 0.5
+# Pontuação mínima (0 a 1) para ser exibido como possível duplicidade
+LIMIAR_SIMILARIDADE = 0.6
+MAX_CANDIDATOS = 50
+
+# Regras fonéticas aplicadas em ordem (adaptação simplificada do BuscaBR)
+REGRAS_FONETICAS = [
+    (r'PH', 'F'), (r'Y', 'I'), (r'W', 'V'), (r'K', 'C'),
+    (r'[GR]?LH', 'L'), (r'NH', 'N'),
+    (r'CH', 'X'), (r'SH', 'X'),
+    (r'SC(?=[EI])', 'S'), (r'SS', 'S'), (r'XC(?=[EI])', 'S'),
+    (r'C(?=[EI])', 'S'), (r'C', 'K'), (r'QU?', 'K'),
+    (r'G(?=[EI])', 'J'), (r'GU(?=[EI])', 'G'),
+    (r'Z', 'S'), (r'X', 'S'),
+    (r'(?<=[AEIOU])S(?=[AEIOU])', 'Z'),
+    (r'N(?=[BP])', 'M'),
+    (r'AO$|AM$|OM$', 'N'),
+    (r'([BCDFGJKLMNPQRSTVZ])L', r'\1R'),
+    (r'H', ''),
+]
+
+def normalizar(texto):
+    """Maiúsculas, sem acentos nem pontuação: 'João  d'Ávila' -> 'JOAO DAVILA'."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).upper()
+    texto = re.sub(r"['`´]", '', texto)
+    return ' '.join(re.sub(r'[^A-Z ]', ' ', texto).split())
+
+def palavras(texto):
+    return [p for p in normalizar(texto).split() if p not in PARTICULAS]
+
+def _fonetica_palavra(palavra):
+    for padrao, troca in REGRAS_FONETICAS:
+        palavra = re.sub(padrao, troca, palavra)
+    if not palavra:
+        return ''
+    # Vogais só contam na primeira letra; finais mudos (S, R, L) são descartados
+    palavra = palavra[0] + re.sub(r'[AEIOU]', '', palavra[1:])
+    palavra = re.sub(r'(.)\1+', r'\1', palavra)
+    if len(palavra) > 1:
+        palavra = re.sub(r'[SRL]$', '', palavra)
+    return palavra
+
+def chave_fonetica(texto):
+    """Chave fonética do nome inteiro: 'Luiz Felipe de Souza' == 'Luis Filipe Sousa'."""
+    return ' '.join(filter(None, map(_fonetica_palavra, palavras(texto)))) or None
+
+def trigramas(texto):
+    """Trigramas por palavra, com bordas: 'SILVA' -> '  S', ' SI', 'SIL', 'ILV', 'LVA', 'VA '."""
+    conjunto = set()
+    for palavra in palavras(texto):
+        marcada = f'  {palavra} '
+        conjunto.update(marcada[i:i + 3] for i in range(len(marcada) - 2))
+    return conjunto
+
+def semelhanca(a, b):
+    """Coeficiente de Dice entre os trigramas de dois nomes (0 a 1)."""
+    ta, tb = trigramas(a), trigramas(b)
+    if not ta or not tb:
+        return 0.0
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+def pontuar(nome, nome_mae, pessoa):
+    pontos = semelhanca(nome, pessoa.nome)
+    if chave_fonetica(nome) == pessoa.chave_fonetica:
+        pontos = max(pontos, 0.9)
+    if nome_mae and pessoa.nome_mae:
+        mae = semelhanca(nome_mae, pessoa.nome_mae)
+        if chave_fonetica(nome_mae) == pessoa.chave_fonetica_mae:
+            mae = max(mae, 0.9)
+        pontos = 0.7 * pontos + 0.3 * mae
+    return round(pontos, 2)
+
+def _ids_por_trigrama(campo, conjunto):
+    minimo = max(1, int(len(conjunto) * MINIMO_TRIGRAMAS))
+    linhas = db.session.query(PessoaTrigrama.pessoa_id) \
+        .filter(PessoaTrigrama.campo == campo, PessoaTrigrama.trigrama.in_(conjunto)) \
+        .group_by(PessoaTrigrama.pessoa_id) \
+        .having(func.count() >= minimo) \
+        .order_by(func.count().desc()) \
+        .limit(MAX_CANDIDATOS)
+    return {pid for pid, in linhas}
+
+def buscar_semelhantes(nome, nome_mae=None, ignorar_id=None, limite=10):
+    """Possíveis duplicidades de (nome, nome_mae), do mais para o menos parecido.
+
+    Os candidatos saem do índice (chave fonética igual ou trigramas do nome
+    em comum acima de MINIMO_TRIGRAMAS); só eles são pontuados, nunca a tabela
+    inteira. O nome da mãe entra apenas na pontuação.
+    """
+    if not palavras(nome):
+        return []
+
+    ids = _ids_por_trigrama('n', trigramas(nome))
+    filtros = [Pessoa.chave_fonetica == chave_fonetica(nome)]
+    if ids:
+        filtros.append(Pessoa.id.in_(ids))
+
+    consulta = Pessoa.query.filter(or_(*filtros))
+    if ignorar_id:
+        consulta = consulta.filter(Pessoa.id != ignorar_id)
+
+    pontuados = [(pontuar(nome, nome_mae, p), p) for p in consulta.limit(MAX_CANDIDATOS * 2)]
+    pontuados = [(pts, p) for pts, p in pontuados if pts >= LIMIAR_SIMILARIDADE]
+    pontuados.sort(key=lambda item: (-item[0], item[1].id))
+    return pontuados[:limite]
+
+# --- Manutenção do índice ---
+
+def _linhas_trigramas(pessoa):
+    # Só o nome: o da mãe entra na pontuação (pela chave fonética e pela
+    # semelhança calculada na hora), nunca na seleção de candidatos
+    return [{'trigrama': t, 'campo': 'n', 'pessoa_id': pessoa.id} for t in trigramas(pessoa.nome)]
+
+def indexar_pessoa(conexao, pessoa):
+    tabela = PessoaTrigrama.__table__
+    conexao.execute(tabela.delete().where(tabela.c.pessoa_id == pessoa.id))
+    linhas = _linhas_trigramas(pessoa)
+    if linhas:
+        conexao.execute(tabela.insert(), linhas)
+
+def _atualizar_chaves(mapper, conexao, pessoa):
+    pessoa.chave_fonetica = chave_fonetica(pessoa.nome)
+    pessoa.chave_fonetica_mae = chave_fonetica(pessoa.nome_mae)
+
+def _apos_inclusao(mapper, conexao, pessoa):
+    indexar_pessoa(conexao, pessoa)
+
+def _apos_alteracao(mapper, conexao, pessoa):
+    estado = db.inspect(pessoa)
+    if estado.attrs.nome.history.has_changes():
+        indexar_pessoa(conexao, pessoa)
+
+def _antes_exclusao(mapper, conexao, pessoa):
+    tabela = PessoaTrigrama.__table__
+    conexao.execute(tabela.delete().where(tabela.c.pessoa_id == pessoa.id))
+
+def registrar_indice_pessoas():
+    for nome, funcao in (('before_insert', _atualizar_chaves), ('before_update', _atualizar_chaves),
+                         ('after_insert', _apos_inclusao), ('after_update', _apos_alteracao),
+                         ('before_delete', _antes_exclusao)):
+        if not event.contains(Pessoa, nome, funcao):
+            event.listen(Pessoa, nome, funcao)
+
+def reindexar_pessoas(tamanho_lote=500, todos=False):
+    """Preenche chaves e trigramas de registros anteriores ao índice."""
+    # Versões anteriores indexavam também o nome da mãe ('m'), que nenhuma busca lê
+    PessoaTrigrama.query.filter(PessoaTrigrama.campo == 'm').delete(synchronize_session=False)
+    db.session.commit()
+    ultimo_id, total = 0, 0
+    while True:
+        consulta = Pessoa.query.filter(Pessoa.id > ultimo_id)
+        if not todos:
+            consulta = consulta.filter(Pessoa.chave_fonetica.is_(None))
+        lote = consulta.order_by(Pessoa.id).limit(tamanho_lote).all()
+        if not lote:
+            return total
+        conexao = db.session.connection()
+        for pessoa in lote:
+            _atualizar_chaves(None, conexao, pessoa)
+            indexar_pessoa(conexao, pessoa)
+        total += len(lote)
+        ultimo_id = lote[-1].id
+        db.session.commit()
+
+def agrupar_duplicados(tamanho_lote=500):
+    """Grupos de registros que parecem ser a mesma pessoa (lista de listas de Pessoa).
+
+    Cada registro consulta o índice uma vez; pares parecidos são unidos
+    (union-find), então A~B e B~C formam um único grupo A, B, C.
+    """
+    pai = {}
+
+    def raiz(pid):
+        while pai.setdefault(pid, pid) != pid:
+            pai[pid] = pai[pai[pid]]
+            pid = pai[pid]
+        return pid
+
+    ultimo_id = 0
+    while True:
+        lote = db.session.query(Pessoa.id, Pessoa.nome, Pessoa.nome_mae) \
+            .filter(Pessoa.id > ultimo_id).order_by(Pessoa.id).limit(tamanho_lote).all()
+        if not lote:
+            break
+        for pid, nome, nome_mae in lote:
+            for _, outra in buscar_semelhantes(nome, nome_mae, ignorar_id=pid, limite=MAX_CANDIDATOS):
+                a, b = raiz(pid), raiz(outra.id)
+                if a != b:
+                    pai[max(a, b)] = min(a, b)
+        ultimo_id = lote[-1][0]
+        db.session.expunge_all()
+
+    grupos = {}
+    for pid in pai:
+        grupos.setdefault(raiz(pid), set()).add(pid)
+    resultado = []
+    for ids in grupos.values():
+        if len(ids) > 1:
+            resultado.append(Pessoa.query.filter(Pessoa.id.in_(ids)).order_by(Pessoa.id).all())
+    resultado.sort(key=lambda grupo: (-len(grupo), grupo[0].id))
+    return resultado
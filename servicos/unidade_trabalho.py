@@ -0,0 +1,74 @@
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from db import db
+
+# Unidade de trabalho por requisição: as rotas só adicionam/alteram objetos
+# (db.session.flush() quando precisam de um id) e o commit é feito uma única
+# vez em after_request. Resposta de erro (>= 400) desfaz tudo. Onde uma falha
+# parcial é aceitável, a rota usa db.session.begin_nested() (SAVEPOINT).
+
+def apos_commit(funcao, *args, **kwargs):
+    """Agenda funcao para depois do commit da requisição (ex: eventos SSE).
+
+    Assim nenhum cliente é avisado de um registro que acabou desfeito.
+    Fora de uma requisição executa na hora.
+    """
+    if has_request_context():
+        g.setdefault('_apos_commit', []).append((funcao, args, kwargs))
+    else:
+        funcao(*args, **kwargs)
+
+def _apos_flush(sessao, contexto):
+    if has_request_context():
+        g._uow_pendente = True
+
+def _apos_commit_sessao(sessao):
+    # Também é chamado no RELEASE de um SAVEPOINT; só o commit real conta
+    if has_request_context() and not sessao.in_nested_transaction():
+        g._uow_commits = g.get('_uow_commits', 0) + 1
+        g._uow_pendente = False
+
+def _apos_rollback(sessao, transacao_anterior):
+    # Rollback de SAVEPOINT não desfaz o que a requisição já gravou antes dele
+    if has_request_context() and not transacao_anterior.nested:
+        g._uow_pendente = False
+
+def _ativar_savepoints_sqlite(engine):
+    # O driver sqlite3 abre/fecha transações por conta própria e quebra SAVEPOINT;
+    # receita da documentação do SQLAlchemy: o BEGIN passa a ser emitido por ele.
+    @event.listens_for(engine, 'connect')
+    def _ao_conectar(conexao_dbapi, registro):
+        conexao_dbapi.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _ao_iniciar(conexao):
+        conexao.exec_driver_sql('BEGIN')
+
+def registrar_unidade_trabalho(app):
+    for nome, funcao in (('after_flush', _apos_flush), ('after_commit', _apos_commit_sessao),
+                         ('after_soft_rollback', _apos_rollback)):
+        event.listen(Session, nome, funcao)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            _ativar_savepoints_sqlite(db.engine)
+
+    @app.after_request
+    def concluir_unidade_trabalho(resposta):
+        sessao = db.session
+        pendente = g.get('_uow_pendente') or sessao.new or sessao.dirty or sessao.deleted
+        tarefas = g.pop('_apos_commit', [])
+        if pendente:
+            if resposta.status_code >= 400:
+                sessao.rollback()
+                tarefas = []
+            else:
+                sessao.commit()  # Erro aqui vira 500 e o teardown descarta a sessão
+
+        for funcao, args, kwargs in tarefas:
+            funcao(*args, **kwargs)
+
+        if app.debug:
+            resposta.headers['X-Commits'] = str(g.get('_uow_commits', 0))
+        return resposta
@@ -0,0 +1,52 @@
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models.boletins import Boletim, AnexoBoletim
+from models.auto_prisao import AutoPrisao
+from models.armas import Arma, MovimentacaoArma
+from models.users import Usuario, Promocao, Advertencia
+
+VERSIONADOS = (Boletim, AutoPrisao, Arma, Usuario)
+
+# Registro filho -> [(modelo pai, atributo com o id do pai)].
+# Qualquer inclusão/alteração/exclusão do filho sobe a versão do pai.
+PAIS = {
+    AnexoBoletim: [(Boletim, 'boletim_id')],
+    MovimentacaoArma: [(Arma, 'arma_id')],
+    Promocao: [(Usuario, 'usuario_id')],
+    Advertencia: [(Usuario, 'usuario_id')],
+    Arma: [(Boletim, 'boletim_id'), (AutoPrisao, 'auto_prisao_id')],
+    Boletim: [(Usuario, 'policial_responsavel_id')],
+    AutoPrisao: [(Usuario, 'policial_responsavel_id')],
+}
+
+def _pais(session, obj):
+    estado = inspect(obj)
+    for modelo, atributo in PAIS.get(type(obj), []):
+        # Pai atual e, se o vínculo mudou, o anterior (ex: B.O. passado a outro oficial)
+        ids = {getattr(obj, atributo)} | set(estado.attrs[atributo].history.deleted or ())
+        for pai_id in ids:
+            if pai_id:
+                # Sem o filtro de delegacia: o oficial pode estar lotado em outra unidade
+                yield session.get(modelo, pai_id, execution_options={'todas_delegacias': True})
+
+def _antes_do_flush(session, contexto, instancias):
+    tocados = set()
+    with session.no_autoflush:
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, VERSIONADOS) and obj in session.dirty \
+                    and session.is_modified(obj, include_collections=True):
+                tocados.add(obj)
+            for pai in _pais(session, obj):
+                if pai is not None and pai not in session.deleted and pai not in session.new:
+                    tocados.add(pai)
+
+    agora = datetime.utcnow()
+    for obj in tocados:
+        obj.versao = (obj.versao or 0) + 1
+        obj.atualizado_em = agora
+
+def registrar_versionamento():
+    if not event.contains(Session, 'before_flush', _antes_do_flush):
+        event.listen(Session, 'before_flush', _antes_do_flush)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import pytest
+
+# O app lê a configuração na importação: banco, auditoria e limites vão para
+# uma pasta temporária, sem agendador nem limite de requisições
+_pasta = tempfile.mkdtemp(prefix='testes_sistema_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_pasta, 'teste.db')
+os.environ['AUDITORIA_DIR'] = os.path.join(_pasta, 'auditoria')
+os.environ['DOSSIE_DIR'] = os.path.join(_pasta, 'dossies')
+os.environ['LIMITES_DB'] = os.path.join(_pasta, 'limites.db')
+os.environ['AGENDADOR_ATIVO'] = '0'
+os.environ['LIMITES_ATIVOS'] = '0'
+
+from app import app as aplicacao  # noqa: E402
+from db import db  # noqa: E402
+from servicos.esquema import atualizar_esquema  # noqa: E402
+from models.delegacias import Delegacia  # noqa: E402
+from models.users import Cargo, Usuario  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    aplicacao.config.update(TESTING=True,
+                            UPLOAD_FOLDER=os.path.join(_pasta, 'fotos_perfil'),
+                            EVIDENCE_FOLDER=os.path.join(_pasta, 'evidencias'))
+    with aplicacao.app_context():
+        atualizar_esquema()
+        yield aplicacao
+        db.session.remove()
+        db.engine.dispose()
+        os.remove(os.path.join(_pasta, 'teste.db'))
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def delegacias(app):
+    """Duas delegacias com um delegado (nível 80, só a própria lotação) em cada."""
+    cargo = Cargo(nome='Delegado de Polícia', nivel=80)
+    primeira, segunda = Delegacia(nome='1ª DP'), Delegacia(nome='2ª DP')
+    db.session.add_all([cargo, primeira, segunda])
+    db.session.flush()
+    usuarios = [Usuario(nome=f'Delegado {d.nome}', matricula=f'del{d.id}', senha='x',
+                        cargo_id=cargo.id, delegacia_id=d.id) for d in (primeira, segunda)]
+    db.session.add_all(usuarios)
+    db.session.commit()
+    return [(d.id, u.id) for d, u in zip((primeira, segunda), usuarios)]
+
+
+def entrar(cliente, usuario_id):
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = usuario_id
@@ -0,0 +1,31 @@
+import pytest
+
+from servicos import compressao
+
+
+@pytest.mark.parametrize('cabecalho, esperada', [
+    ('br;q=0.1, gzip;q=1', 'gzip'),
+    ('gzip;q=0, br;q=0', None),
+    ('identity', None),
+])
+def test_codificacao_aceita_escolhe_maior_q(app, cabecalho, esperada):
+    with app.test_request_context(headers={'Accept-Encoding': cabecalho}):
+        assert compressao._codificacao_aceita() == esperada
+
+
+@pytest.mark.parametrize('cabecalho, esperada', [
+    ('gzip;q=0.5, br;q=0.5', 'br'),
+    ('gzip, br', 'br'),
+    ('br;q=1, gzip;q=0.8', 'br'),
+    ('*;q=0.3', 'br'),
+])
+def test_brotli_so_desempata(app, cabecalho, esperada):
+    pytest.importorskip('brotli')
+    with app.test_request_context(headers={'Accept-Encoding': cabecalho}):
+        assert compressao._codificacao_aceita() == esperada
+
+
+def test_sem_brotli_usa_gzip(app, monkeypatch):
+    monkeypatch.setattr(compressao, 'brotli', None)
+    with app.test_request_context(headers={'Accept-Encoding': 'br;q=1, gzip;q=0.2'}):
+        assert compressao._codificacao_aceita() == 'gzip'
@@ -0,0 +1,85 @@
+import hashlib
+
+from flask import g
+
+from db import db
+from models.api import TokenApi
+from models.boletins import AnexoBoletim, Boletim
+from models.users import Usuario
+from servicos import busca
+from servicos.delegacias import NENHUMA, definir_escopo
+from conftest import entrar
+
+
+def test_excluir_anexo_de_outra_delegacia_da_404(cliente, delegacias):
+    (primeira, _), (_, delegado_segunda) = delegacias
+    boletim = Boletim(autor='Autor', vitima='Vítima', descricao='Furto', delegacia_id=primeira)
+    db.session.add(boletim)
+    db.session.flush()
+    anexo = AnexoBoletim(boletim_id=boletim.id, arquivo='anexo_teste.pdf', tipo='Documento')
+    db.session.add(anexo)
+    db.session.commit()
+
+    entrar(cliente, delegado_segunda)
+    resposta = cliente.get(f'/boletins/anexo/excluir/{anexo.id}')
+
+    assert resposta.status_code == 404
+    assert db.session.get(AnexoBoletim, anexo.id) is not None
+
+
+def test_excluir_anexo_da_propria_delegacia(cliente, delegacias):
+    (primeira, delegado_primeira), _ = delegacias
+    boletim = Boletim(autor='Autor', vitima='Vítima', descricao='Furto', delegacia_id=primeira)
+    db.session.add(boletim)
+    db.session.flush()
+    anexo = AnexoBoletim(boletim_id=boletim.id, arquivo='anexo_teste.pdf', tipo='Documento')
+    db.session.add(anexo)
+    db.session.commit()
+    anexo_id = anexo.id
+
+    entrar(cliente, delegado_primeira)
+    resposta = cliente.get(f'/boletins/anexo/excluir/{anexo_id}')
+
+    assert resposta.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(AnexoBoletim, anexo_id) is None
+
+
+def test_token_de_usuario_excluido_da_401(cliente, delegacias):
+    (primeira, delegado_primeira), _ = delegacias
+    db.session.add(Boletim(autor='Autor', vitima='Vítima', descricao='Furto', delegacia_id=primeira))
+    db.session.add(TokenApi(nome='Viatura', usuario_id=delegado_primeira,
+                            token_hash=hashlib.sha256(b'segredo').hexdigest()))
+    db.session.commit()
+    cabecalhos = {'Authorization': 'Bearer segredo'}
+    assert cliente.get('/api/v1/boletins', headers=cabecalhos).status_code == 200
+
+    db.session.delete(db.session.get(Usuario, delegado_primeira))
+    db.session.commit()
+
+    assert cliente.get('/api/v1/boletins', headers=cabecalhos).status_code == 401
+
+
+def test_sessao_de_usuario_excluido_nao_ve_nenhuma_delegacia(app, delegacias):
+    (primeira, _), _ = delegacias
+    db.session.add(Boletim(autor='Autor', vitima='Vítima', descricao='Furto', delegacia_id=primeira))
+    db.session.commit()
+
+    with app.test_request_context():
+        assert definir_escopo(9999) is False
+        assert g.escopo_delegacia == NENHUMA
+        assert Boletim.query.count() == 0
+
+
+def test_busca_conta_e_pagina_so_a_delegacia_em_foco(app, delegacias):
+    (primeira, delegado_primeira), (segunda, delegado_segunda) = delegacias
+    db.session.add_all([Boletim(autor='Autor', vitima='Vítima', descricao='Furto de bicicleta', delegacia_id=d)
+                        for d in (primeira, segunda, segunda)])
+    db.session.commit()
+
+    for usuario_id, esperado in ((delegado_primeira, 1), (delegado_segunda, 2)):
+        with app.test_request_context():
+            definir_escopo(usuario_id)
+            resultado = busca.buscar('bicicleta')
+        assert resultado['total'] == esperado
+        assert len(resultado['itens']) == esperado
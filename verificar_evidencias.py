@@ -0,0 +1,35 @@
+# Arquivo: verificar_evidencias.py
+# Confere static/evidencias e static/fotos_perfil contra o banco e o manifesto de checksums:
+# arquivos órfãos, referências a arquivos que sumiram e arquivos alterados desde o upload.
+# Só re-hasheia o que mudou de tamanho/mtime desde a última verificação (--completo re-hasheia tudo).
+# Uso: python verificar_evidencias.py [--reclamar] [--completo] [--trabalhadores N]
+import sys
+from app import app
+from servicos.esquema import atualizar_esquema
+from servicos.integridade import verificar_integridade, TRABALHADORES
+
+def _listar(titulo, itens):
+    print(f"{titulo}: {len(itens)}")
+    for pasta, nome in itens:
+        print(f"  {pasta}/{nome}")
+
+def executar(reclamar=False, completo=False, trabalhadores=TRABALHADORES):
+    with app.app_context():
+        atualizar_esquema()
+        relatorio = verificar_integridade(completo=completo, reclamar=reclamar, trabalhadores=trabalhadores)
+        print(f"{relatorio['arquivos']} arquivos, {relatorio['verificados']} hasheados, "
+              f"{relatorio['novos']} novos no manifesto.")
+        _listar("Alterados desde o upload", relatorio['alterados'])
+        _listar("Referências quebradas", relatorio['referencias_quebradas'])
+        _listar("Órfãos", relatorio['orfaos'])
+        if reclamar:
+            _listar("Órfãos removidos", relatorio['reclamados'])
+        # Código de saída diferente de zero para uso em cron/monitoramento
+        return 1 if relatorio['alterados'] or relatorio['referencias_quebradas'] else 0
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    trabalhadores = TRABALHADORES
+    if '--trabalhadores' in argumentos:
+        trabalhadores = int(argumentos[argumentos.index('--trabalhadores') + 1])
+    sys.exit(executar('--reclamar' in argumentos, '--completo' in argumentos, trabalhadores))
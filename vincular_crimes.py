@@ -0,0 +1,85 @@
+# Arquivo: vincular_crimes.py
+# Backfill único: lê o prefixo "[Natureza: X]" / "[Autuado por: X]" das descrições
+# antigas e grava o vínculo estruturado em boletins_crimes / autos_crimes.
+import re
+from app import app, db
+from models.boletins import Boletim
+from models.auto_prisao import AutoPrisao
+from models.crimes import Crime
+from servicos.esquema import atualizar_esquema
+from servicos.estatisticas import ajustar_crimes_boletim
+
+PREFIXO = re.compile(r'^\[(?:Natureza|Autuado por): (.+?)\]')
+TAMANHO_LOTE = 500
+
+def _normalizar(rotulo):
+    # "Art. 1,2" e "Art. 1, 2" são o mesmo rótulo
+    return re.sub(r'\s*,\s*', ', ', rotulo.strip().lower())
+
+def mapa_crimes():
+    # Aceita tanto "Nome (Art.)" (formato do formulário) quanto só o nome
+    mapa = {}
+    for crime in Crime.query.all():
+        mapa[_normalizar(crime.nome)] = crime
+        mapa[_normalizar(crime.rotulo)] = crime
+    return mapa
+
+def crimes_do_texto(texto, mapa):
+    """Crimes do prefixo e os trechos que não casaram com o catálogo.
+
+    O prefixo inteiro é tentado primeiro: o artigo pode conter vírgula. Se não
+    casar, divide nas vírgulas e junta o maior trecho consecutivo conhecido.
+    """
+    m = PREFIXO.match(texto or '')
+    if not m:
+        return [], []
+    partes = m.group(1).split(',')
+    encontrados, ignorados = [], []
+    i = 0
+    while i < len(partes):
+        for j in range(len(partes), i, -1):
+            crime = mapa.get(_normalizar(','.join(partes[i:j])))
+            if crime:
+                if crime not in encontrados:
+                    encontrados.append(crime)
+                i = j
+                break
+        else:
+            if partes[i].strip():
+                ignorados.append(partes[i].strip())
+            i += 1
+    return encontrados, ignorados
+
+def vincular(modelo, campo_texto, mapa):
+    ultimo_id, vinculados = 0, 0
+    while True:
+        lote = modelo.query.filter(modelo.id > ultimo_id).order_by(modelo.id).limit(TAMANHO_LOTE).all()
+        if not lote:
+            break
+        for registro in lote:
+            crimes_anteriores = list(registro.crimes)
+            crimes, ignorados = crimes_do_texto(getattr(registro, campo_texto), mapa)
+            for rotulo in ignorados:
+                print(f"  {modelo.__tablename__} #{registro.id}: natureza não encontrada no catálogo: {rotulo!r}")
+            for crime in crimes:
+                if crime not in registro.crimes:
+                    registro.crimes.append(crime)
+                    vinculados += 1
+            if modelo is Boletim:
+                # B.O. já agregado no painel: o vínculo novo entra em boletins_crime
+                ajustar_crimes_boletim(registro, crimes_anteriores)
+        ultimo_id = lote[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+    return vinculados
+
+def executar():
+    with app.app_context():
+        atualizar_esquema()
+        mapa = mapa_crimes()
+        total_bo = vincular(Boletim, 'descricao', mapa)
+        total_auto = vincular(AutoPrisao, 'descricao_fato', mapa)
+        print(f"Vínculos criados: {total_bo} boletins, {total_auto} autos de prisão.")
+
+if __name__ == "__main__":
+    executar()
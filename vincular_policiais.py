@@ -0,0 +1,54 @@
+# Arquivo: vincular_policiais.py
+# Backfill único: preenche policial_responsavel_id em boletins e autos de prisão
+# a partir do nome gravado em policial_responsavel.
+from app import app, db
+from models.users import Usuario
+from models.boletins import Boletim
+from models.auto_prisao import AutoPrisao
+from servicos.esquema import atualizar_esquema
+from servicos.estatisticas import recalcular_estatisticas
+
+TAMANHO_LOTE = 500
+
+def mapa_nomes():
+    # Nomes repetidos ficam de fora: não dá para saber a qual oficial pertencem
+    contagem, mapa = {}, {}
+    for uid, nome in db.session.query(Usuario.id, Usuario.nome):
+        chave = nome.strip().lower()
+        contagem[chave] = contagem.get(chave, 0) + 1
+        mapa[chave] = uid
+    return {nome: uid for nome, uid in mapa.items() if contagem[nome] == 1}
+
+def vincular(modelo, mapa):
+    ultimo_id, vinculados, sem_par = 0, 0, set()
+    while True:
+        lote = db.session.query(modelo.id, modelo.policial_responsavel) \
+            .filter(modelo.id > ultimo_id, modelo.policial_responsavel_id.is_(None)) \
+            .order_by(modelo.id).limit(TAMANHO_LOTE).all()
+        if not lote:
+            break
+        for registro_id, nome in lote:
+            uid = mapa.get((nome or '').strip().lower())
+            if uid:
+                modelo.query.filter_by(id=registro_id).update({'policial_responsavel_id': uid})
+                vinculados += 1
+            elif nome:
+                sem_par.add(nome)
+        ultimo_id = lote[-1][0]
+        db.session.commit()
+    return vinculados, sem_par
+
+def executar():
+    with app.app_context():
+        atualizar_esquema()
+        mapa = mapa_nomes()
+        total_bo, sem_par_bo = vincular(Boletim, mapa)
+        total_auto, sem_par_auto = vincular(AutoPrisao, mapa)
+        # "Prisões por policial" passa a ser agregado pelo id do oficial
+        recalcular_estatisticas()
+        print(f"Vinculados: {total_bo} boletins, {total_auto} autos de prisão.")
+        for nome in sorted(sem_par_bo | sem_par_auto):
+            print(f"  Sem correspondência: {nome}")
+
+if __name__ == "__main__":
+    executar()